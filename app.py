@@ -1,98 +1,261 @@
 #!/usr/bin/env python3
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session
-from datetime import date
-import csv
-import io
+from flask import (Flask, current_app, render_template, request, redirect, url_for, flash, jsonify, session,
+                   abort)
+from flask.cli import with_appcontext
+from functools import wraps
+from datetime import date, datetime
 import sys
-from sqlalchemy.orm.attributes import flag_modified
-from models import db, Person, GiftIdea, Task, Milestone, AnnualSummary, EcardDelivery
-from forms import PersonForm, GiftIdeaForm, ImportCSVForm, ImportEcardDeliveriesForm, CompleteGiftForm
+import click
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, Person, GiftIdea, Task, Milestone, MilestoneSubtask, AnnualSummary, EcardDelivery, ImportJob
+from stats import load_dashboard_stats
+from migrations import check_query_plans
+from scheduler import run_rollover_job, start_rollover_scheduler, pop_rollover_notice, pending_rollover_notice
+from pagination import PEOPLE_SORTS, paginate_people
+from search import search, rebuild_search_index
+from duplicates import find_duplicates, find_all_duplicates, index_people
+from rollups import rebuild_year_rollups, check_year_rollups
+from http_cache import conditional, track_writes
+from archives import (get_archive_snapshot, list_archive_summaries, backfill_archive_snapshots,
+                      archive_snapshot_version, archive_list_version)
+from instrumentation import init_instrumentation, render_metrics
+from loaders import load_unused_gift_ideas, load_tasks, load_people_with_task_status
 from utils import (
-    get_active_year, get_current_phase, check_and_perform_rollover,
-    perform_rollover, initialize_database, days_until_christmas,
-    normalize_phone, format_phone
+    get_active_year, get_current_phase, perform_rollover, initialize_database, days_until_christmas,
+    normalize_phone, format_phone, active_year_cache_info, apply_task_mutations, set_task_state, TASK_TYPES
 )
 
 import os
 
-app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
-# Use absolute path to database
-db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'database.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+try:
+    import fcntl
+except ImportError:  # Windows: startup is only serialized within a process
+    fcntl = None
+
+# Views and CLI commands are declared below with @route and @command and
+# registered on each app that create_app() builds
+_routes = []
+_commands = []
+
+
+def route(rule, **options):
+    """Declare a view for create_app() to register, like @app.route."""
+    def decorator(view):
+        _routes.append((rule, options, view))
+        return view
+    return decorator
+
+
+def command(name):
+    """Declare a CLI command for create_app() to register, like @app.cli.command.
+
+    The database is initialized before the command runs.
+    """
+    def decorator(callback):
+        @wraps(callback)
+        def run(*args, **kwargs):
+            init_database(current_app._get_current_object())
+            return callback(*args, **kwargs)
+        cli_command = click.command(name)(with_appcontext(run))
+        _commands.append(cli_command)
+        return cli_command
+    return decorator
+
+
+def create_app(config=None):
+    """Build and configure an app: settings, database, routes and commands.
+
+    Settings come from the defaults below, then FLASK_* environment
+    variables, then ``config``. The database is not touched until the
+    first request or CLI command (or an explicit init_database call).
+    """
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = 'your-secret-key-here-change-in-production'
+    # Use absolute path to database
+    db_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance', 'database.db')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Rows committed per transaction when importing CSV uploads
+    app.config['IMPORT_CHUNK_SIZE'] = 1000
+    # Seconds the active planning year is cached per process (cleared on archive)
+    app.config['ACTIVE_YEAR_CACHE_TTL'] = 300
+    # People shown per page (and per infinite-scroll fetch) on /people
+    app.config['PEOPLE_PAGE_SIZE'] = 50
+    # Most duplicate pairs listed on /people/duplicates
+    app.config['DUPLICATES_REPORT_LIMIT'] = 500
+    # Maximum results on /search (and the default for /api/search)
+    app.config['SEARCH_RESULTS_LIMIT'] = 50
+    # Year rollover runs in a background thread, never inside a request
+    app.config['ROLLOVER_SCHEDULER'] = True
+    app.config['ROLLOVER_CHECK_INTERVAL'] = 3600
+    # Rendered archived-year pages kept in memory per process (see http_cache.py)
+    app.config['ARCHIVE_PAGE_CACHE_SIZE'] = 32
+    # Most task changes accepted by one POST /api/tasks/batch
+    app.config['TASK_BATCH_LIMIT'] = 1000
+    # Requests and statements slower than this are logged (see instrumentation.py)
+    app.config['SLOW_REQUEST_MS'] = 500
+    app.config['SLOW_QUERY_MS'] = 100
+    # Applied to every new SQLite connection. WAL lets the dashboard keep reading
+    # while a task toggle commits; set to {} to use SQLite's defaults.
+    app.config['SQLITE_PRAGMAS'] = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -32000,  # Negative means KiB, so about 32 MB
+        'busy_timeout': 5000,  # Milliseconds to wait for a lock before failing
+        'temp_store': 'MEMORY',
+    }
+    # Allow overrides from the environment, e.g. FLASK_SQLALCHEMY_DATABASE_URI
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        """Apply the configured SQLITE_PRAGMAS to a new connection."""
+        cursor = dbapi_connection.cursor()
+        for pragma, value in app.config['SQLITE_PRAGMAS'].items():
+            cursor.execute(f'PRAGMA {pragma} = {value}')
+        cursor.close()
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', apply_sqlite_pragmas)
+        # Statement counts and DB time per request, Server-Timing and slow logs
+        init_instrumentation(app, db.engine)
+
+    # Every committed write changes the version behind ETags
+    track_writes(db.session)
+
+    # Add custom template filters
+    app.jinja_env.filters['format_phone'] = format_phone
+
+    @app.before_request
+    def ensure_started():
+        """Initialize the database and start the rollover scheduler in this process."""
+        init_database(app)
+        start_rollover_scheduler(app)
+
+    for rule, options, view in _routes:
+        app.add_url_rule(rule, view_func=view, **options)
+    for cli_command in _commands:
+        app.cli.add_command(cli_command)
+    return app
+
+
+def init_database(app):
+    """Run initialize_database once per app, one process at a time.
+
+    Worker processes starting together wait on a file lock in instance/
+    instead of creating tables and seeding milestones concurrently. With a
+    preloading server, wsgi.py runs this once in the master process before
+    workers are forked.
+    """
+    if app.extensions.get('database_ready'):
+        return
+
+    os.makedirs(app.instance_path, exist_ok=True)
+    with open(os.path.join(app.instance_path, 'startup.lock'), 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with app.app_context():
+            initialize_database()
+            # Don't hand pooled connections to forked workers
+            db.engine.dispose()
+    app.extensions['database_ready'] = True
+
+
+@command('init-db')
+def init_db_command():
+    """Create missing tables and indexes and seed this year's milestones."""
+    print('Database initialized.')
+
+
+@command('rollover')
+def rollover_command():
+    """Archive the previous year now if a rollover is due."""
+    summary = run_rollover_job(current_app._get_current_object())
+    if summary:
+        print(f"Archived {summary['year']}: {summary}")
+    else:
+        print('No rollover needed.')
 
-db.init_app(app)
 
-# Initialize database on first run
-with app.app_context():
-    initialize_database()
+@command('check-indexes')
+def check_indexes_command():
+    """Verify that every hot query shape is served by an index."""
+    failures = 0
+    for label, plan, uses_index in check_query_plans():
+        print(f"{'ok  ' if uses_index else 'SCAN'} {label}: {'; '.join(plan)}")
+        failures += not uses_index
+    sys.exit(1 if failures else 0)
 
-# Add custom template filters
-app.jinja_env.filters['format_phone'] = format_phone
 
+@command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Re-index every person and gift idea for full-text search."""
+    rebuild_search_index()
+    print('Search index rebuilt.')
 
-@app.route('/')
-def dashboard():
-    """Dashboard with timeline view and stats."""
-    # Check for year rollover (automatic or from manual archive)
-    rollover_summary = session.pop('rollover_summary', None) or check_and_perform_rollover()
 
-    active_year = get_active_year()
-    current_phase = get_current_phase()
+@command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute every year's rollup counters from tasks and deliveries."""
+    rebuild_year_rollups()
+    print('Year rollups rebuilt.')
 
-    # Get stats for current year
-    total_people = Person.query.filter_by(active=True).count()
-    people_with_gifts = Person.query.filter_by(active=True, gets_gift=True).count()
 
-    # Count handwritten cards needed
-    handwritten_count = Person.query.filter_by(
-        active=True,
-        card_preference='Handwritten'
-    ).count()
+@command('check-rollups')
+def check_rollups_command():
+    """Verify the year rollup counters against a full recount."""
+    mismatches = check_year_rollups()
+    for year, column, stored, actual in mismatches:
+        print(f'{year} {column}: stored {stored}, actual {actual}')
+    if mismatches:
+        print(f'{len(mismatches)} counters out of date; run `flask --app app rebuild-rollups`.')
+    else:
+        print('Year rollups are consistent.')
+    sys.exit(1 if mismatches else 0)
+
+
+@command('backfill-archive-snapshots')
+@click.option('--rebuild', is_flag=True, help='Snapshot every archived year again.')
+def backfill_archive_snapshots_command(rebuild):
+    """Snapshot archived years that are missing from the archive pages."""
+    # Missing years were already snapshotted while initializing the database
+    years = backfill_archive_snapshots(rebuild=rebuild)
+    if years:
+        print(f'Snapshotted {", ".join(map(str, years))}.')
+    else:
+        print('Archive snapshots are up to date.')
 
-    # Count e-cards needed
-    ecard_count = Person.query.filter_by(
-        active=True,
-        card_preference='E-card'
-    ).count()
 
-    # Calculate total budget
-    total_budget = db.session.query(db.func.sum(Person.budget)).filter(
-        Person.active == True,
-        Person.gets_gift == True,
-        Person.budget.isnot(None)
-    ).scalar() or 0
+@route('/')
+def dashboard():
+    """Dashboard with timeline view and stats."""
+    # Show a completed rollover (manual archive, or the background scheduler)
+    rollover_summary = session.pop('rollover_summary', None) or pop_rollover_notice()
 
-    # Get milestones for current year
-    milestones = Milestone.query.filter_by(year=active_year).order_by(Milestone.phase).all()
+    # Resolve the planning year and phase once for the whole request
+    active_year = get_active_year()
+    current_phase = get_current_phase(active_year)
+
+    stats = load_dashboard_stats(active_year, current_phase)
+
+    # Get milestones for current year, with their subtasks in one more query
+    milestones = Milestone.query.filter_by(year=active_year).options(
+        db.selectinload(Milestone.subtasks)
+    ).order_by(Milestone.phase).all()
 
     # Get current phase milestone
-    current_milestone = Milestone.query.filter_by(year=active_year, phase=current_phase).first()
+    current_milestone = next((m for m in milestones if m.phase == current_phase), None)
 
     # Calculate milestone completion
     completed_milestones = sum(1 for m in milestones if m.completed)
     milestone_progress = (completed_milestones / len(milestones) * 100) if milestones else 0
 
-    # Get tasks for current year
-    gift_tasks_completed = Task.query.filter_by(
-        year=active_year,
-        task_type='gift_purchased',
-        completed=True
-    ).count()
-
-    cards_written = Task.query.filter_by(
-        year=active_year,
-        task_type='card_written',
-        completed=True
-    ).count()
-
-    gifts_given = Task.query.filter_by(
-        year=active_year,
-        task_type='gift_given',
-        completed=True
-    ).count()
-
     # Calculate days until Christmas
     countdown = days_until_christmas(active_year)
 
@@ -100,23 +263,24 @@ def dashboard():
                            active_year=active_year,
                            current_phase=current_phase,
                            current_milestone=current_milestone,
-                           total_people=total_people,
-                           people_with_gifts=people_with_gifts,
-                           handwritten_count=handwritten_count,
-                           ecard_count=ecard_count,
-                           total_budget=total_budget,
+                           stats=stats,
                            milestones=milestones,
                            milestone_progress=milestone_progress,
-                           gift_tasks_completed=gift_tasks_completed,
-                           cards_written=cards_written,
-                           gifts_given=gifts_given,
                            countdown=countdown,
                            rollover_summary=rollover_summary)
 
 
-@app.route('/people')
-def people_list():
-    """List all people with filtering."""
+@route('/api/dashboard-stats', methods=['GET'])
+def api_dashboard_stats():
+    """AJAX endpoint with the dashboard stats for the active year."""
+    active_year = get_active_year()
+    stats = load_dashboard_stats(active_year, get_current_phase(active_year))
+
+    return jsonify({'success': True, 'stats': stats.to_dict()})
+
+
+def _filtered_people_query():
+    """Active people matching the type/card/gift filters in the query string."""
     person_type = request.args.get('type', '')
     card_pref = request.args.get('card', '')
     gift_status = request.args.get('gift', '')
@@ -131,38 +295,99 @@ def people_list():
         gets_gift = gift_status == 'yes'
         query = query.filter_by(gets_gift=gets_gift)
 
-    people = query.order_by(Person.name).all()
+    return query
 
-    return render_template('people_list.html', people=people)
 
+@route('/people')
+def people_list():
+    """List people with filtering, one page at a time."""
+    sort = request.args.get('sort', 'name')
+    if sort not in PEOPLE_SORTS:
+        sort = 'name'
+
+    try:
+        people, next_cursor = paginate_people(_filtered_people_query(), sort,
+                                              request.args.get('after'), current_app.config['PEOPLE_PAGE_SIZE'])
+    except ValueError:
+        # Stale or mangled cursor: start again from the first page
+        people, next_cursor = paginate_people(_filtered_people_query(), sort,
+                                              per_page=current_app.config['PEOPLE_PAGE_SIZE'])
+
+    # Filters and sort carried over to the next page
+    list_args = {key: value for key, value in request.args.items() if key != 'after' and value}
+
+    return render_template('people_list.html', people=people, next_cursor=next_cursor,
+                           list_args=list_args, sort=sort, first_page=not request.args.get('after'))
+
+
+@route('/api/people', methods=['GET'])
+def api_people():
+    """AJAX endpoint returning one page of the people list, for infinite scroll."""
+    try:
+        people, next_cursor = paginate_people(_filtered_people_query(), request.args.get('sort', 'name'),
+                                              request.args.get('after'), current_app.config['PEOPLE_PAGE_SIZE'])
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
-@app.route('/people/new', methods=['GET', 'POST'])
-def person_new():
-    """Add a new person."""
-    form = PersonForm()
+    return jsonify({
+        'success': True,
+        'people': [{
+            'id': person.id,
+            'name': person.name,
+            'email': person.email,
+            'phone': person.phone,
+            'person_type': person.person_type,
+            'card_preference': person.card_preference,
+            'gets_gift': person.gets_gift,
+            'budget': person.budget
+        } for person in people],
+        'next_cursor': next_cursor,
+        'rows_html': render_template('components/people_rows.html', people=people)
+    })
 
-    if form.validate_on_submit():
-        # Check for duplicates
-        duplicates = []
 
-        # Check name
-        if Person.query.filter_by(active=True, name=form.name.data).first():
-            duplicates.append(f'name "{form.name.data}"')
+@route('/people/duplicates')
+def people_duplicates():
+    """Report of every pair of people that look like duplicates."""
+    pairs = find_all_duplicates()
+    limit = current_app.config['DUPLICATES_REPORT_LIMIT']
+
+    return render_template('duplicates.html', pairs=pairs[:limit], total=len(pairs))
+
+
+@route('/search')
+def search_page():
+    """Full-text search over people, notes and gift ideas."""
+    query = request.args.get('q', '').strip()
+    results = search(query, limit=current_app.config['SEARCH_RESULTS_LIMIT']) if query else []
+
+    return render_template('search.html', query=query, results=results)
 
-        # Check email if provided
-        if form.email.data and form.email.data.strip():
-            if Person.query.filter_by(active=True, email=form.email.data).first():
-                duplicates.append(f'email "{form.email.data}"')
 
-        # Check phone if provided
-        if form.phone.data and form.phone.data.strip():
-            normalized = normalize_phone(form.phone.data)
-            if normalized and Person.query.filter_by(active=True, phone=normalized).first():
-                duplicates.append(f'phone "{form.phone.data}"')
+@route('/api/search', methods=['GET'])
+def api_search():
+    """AJAX endpoint returning ranked search results; snippets are HTML."""
+    query = request.args.get('q', '').strip()
+    # 0 or a negative limit would reach SQLite as LIMIT -1, which means no limit
+    limit = max(1, min(request.args.get('limit', current_app.config['SEARCH_RESULTS_LIMIT'], type=int), 100))
 
-        if duplicates:
-            flash(f'Warning: A person with the same {", ".join(duplicates)} already exists!', 'warning')
-            return render_template('person_form.html', form=form, title='Add Person')
+    return jsonify({'success': True, 'results': search(query, limit=limit)})
+
+
+@route('/people/new', methods=['GET', 'POST'])
+def person_new():
+    """Add a new person."""
+    from forms import PersonForm
+    form = PersonForm()
+
+    if form.validate_on_submit():
+        # Check for likely duplicates, unless the user has already seen them
+        if not request.form.get('confirm_duplicates'):
+            duplicates = find_duplicates(form.name.data, form.email.data, normalize_phone(form.phone.data))
+            if duplicates:
+                flash('Warning: this looks like someone who already exists. '
+                      'Check the matches below, or add them anyway.', 'warning')
+                return render_template('person_form.html', form=form, title='Add Person', duplicates=duplicates)
 
         person = Person(
             name=form.name.data,
@@ -177,6 +402,8 @@ def person_new():
             ai_chat_link=form.ai_chat_link.data
         )
         db.session.add(person)
+        db.session.flush()
+        index_people([person.id])
         db.session.commit()
 
         flash(f'Added {person.name}!', 'success')
@@ -185,7 +412,7 @@ def person_new():
     return render_template('person_form.html', form=form, title='Add Person')
 
 
-@app.route('/people/<int:id>')
+@route('/people/<int:id>')
 def person_detail(id):
     """View person details with history."""
     person = Person.query.get_or_404(id)
@@ -220,9 +447,10 @@ def person_detail(id):
                            active_year=active_year)
 
 
-@app.route('/people/<int:id>/edit', methods=['GET', 'POST'])
+@route('/people/<int:id>/edit', methods=['GET', 'POST'])
 def person_edit(id):
     """Edit a person."""
+    from forms import PersonForm
     person = Person.query.get_or_404(id)
     form = PersonForm(obj=person)
 
@@ -238,6 +466,7 @@ def person_edit(id):
         person.notes = form.notes.data
         person.ai_chat_link = form.ai_chat_link.data
 
+        index_people([person.id])
         db.session.commit()
         flash(f'Updated {person.name}!', 'success')
         return redirect(url_for('person_detail', id=person.id))
@@ -245,7 +474,7 @@ def person_edit(id):
     return render_template('person_form.html', form=form, title='Edit Person', person=person)
 
 
-@app.route('/people/<int:id>/delete', methods=['POST'])
+@route('/people/<int:id>/delete', methods=['POST'])
 def person_delete(id):
     """Delete a person (soft delete)."""
     person = Person.query.get_or_404(id)
@@ -256,7 +485,7 @@ def person_delete(id):
     return redirect(url_for('people_list'))
 
 
-@app.route('/people/<int:id>/add-idea', methods=['POST'])
+@route('/people/<int:id>/add-idea', methods=['POST'])
 def add_gift_idea(id):
     """Add a gift idea for a person."""
     person = Person.query.get_or_404(id)
@@ -279,73 +508,28 @@ def add_gift_idea(id):
     return redirect(url_for('person_detail', id=person.id))
 
 
-@app.route('/import', methods=['GET', 'POST'])
+@route('/import', methods=['GET', 'POST'])
 def import_csv():
     """Import people from CSV."""
+    from forms import ImportCSVForm
+    from importers import start_import_job
     form = ImportCSVForm()
 
     if form.validate_on_submit():
-        csv_file = request.files['csv_file']
-
-        # Read CSV
-        stream = io.StringIO(csv_file.stream.read().decode("UTF8"), newline=None)
-        csv_reader = csv.DictReader(stream)
-
-        imported_count = 0
-        skipped_count = 0
-
-        for row in csv_reader:
-            name = row.get('Full Name', '').strip()
-            contact_info = row.get('Email/Phone Number', '').strip()
-
-            if not name:
-                continue
-
-            # Detect if contact_info is email or phone
-            email = None
-            phone = None
-            if contact_info:
-                if '@' in contact_info:
-                    email = contact_info
-                else:
-                    phone = normalize_phone(contact_info)
-
-            # Check for duplicate (by name and either email or phone)
-            existing = None
-            if email:
-                existing = Person.query.filter_by(name=name, email=email, active=True).first()
-            elif phone:
-                existing = Person.query.filter_by(name=name, phone=phone, active=True).first()
-            else:
-                existing = Person.query.filter_by(name=name, active=True).first()
-
-            if existing:
-                skipped_count += 1
-                continue
-
-            # Create new person with defaults
-            person = Person(
-                name=name,
-                email=email,
-                phone=phone,
-                person_type='Other',
-                card_preference='E-card',
-                gets_gift=False
-            )
-            db.session.add(person)
-            imported_count += 1
+        # Import runs in the background; the job page polls for progress
+        job_id = start_import_job(current_app._get_current_object(), 'people',
+                                  request.files['csv_file'], result_url=url_for('people_list'))
 
-        db.session.commit()
-
-        flash(f'Imported {imported_count} people. Skipped {skipped_count} duplicates.', 'success')
-        return redirect(url_for('people_list'))
+        return redirect(url_for('import_job', job_id=job_id))
 
     return render_template('import.html', form=form)
 
 
-@app.route('/import-ecard-deliveries', methods=['GET', 'POST'])
+@route('/import-ecard-deliveries', methods=['GET', 'POST'])
 def import_ecard_deliveries():
     """Import e-card delivery data from Paperless Post CSV."""
+    from forms import ImportEcardDeliveriesForm
+    from importers import start_import_job
     form = ImportEcardDeliveriesForm()
 
     # Set default year: most recently completed season
@@ -361,85 +545,36 @@ def import_ecard_deliveries():
         form.year.data = default_year
 
     if form.validate_on_submit():
-        csv_file = request.files['csv_file']
         delivery_year = form.year.data
 
-        # Read CSV
-        stream = io.StringIO(csv_file.stream.read().decode("UTF8"), newline=None)
-        csv_reader = csv.DictReader(stream)
-
-        imported_count = 0
-        updated_count = 0
-        skipped_count = 0
-        errors = []
-
-        for row in csv_reader:
-            name = row.get('Full Name', '').strip()
-            contact_info = row.get('Email/Phone Number', '').strip()
-            status = row.get('Status', '').strip()
-            message = row.get('Message', '').strip()
-            contact_type = row.get('Type', '').strip()  # 'email' or 'sms'
-
-            if not name or not contact_info:
-                continue
-
-            # Normalize phone if it's SMS
-            if contact_type == 'sms':
-                contact_info = normalize_phone(contact_info)
-
-            # Find matching person by contact info
-            person = None
-            if contact_type == 'sms' and contact_info:
-                person = Person.query.filter_by(phone=contact_info, active=True).first()
-            elif contact_type == 'email':
-                person = Person.query.filter_by(email=contact_info, active=True).first()
-
-            if not person:
-                # Try to find by name as fallback
-                person = Person.query.filter_by(name=name, active=True).first()
-                if not person:
-                    errors.append(f'Could not find person: {name} ({contact_info})')
-                    skipped_count += 1
-                    continue
-
-            # Check if delivery record already exists
-            existing = EcardDelivery.query.filter_by(
-                person_id=person.id,
-                year=delivery_year,
-                contact_used=contact_info
-            ).first()
-
-            if existing:
-                # Update existing record
-                existing.status = status
-                existing.message = message if message else existing.message
-                existing.imported_date = date.today()
-                updated_count += 1
-            else:
-                # Create new delivery record
-                delivery = EcardDelivery(
-                    person_id=person.id,
-                    year=delivery_year,
-                    status=status,
-                    contact_used=contact_info,
-                    contact_type=contact_type,
-                    message=message if message else None
-                )
-                db.session.add(delivery)
-                imported_count += 1
+        job_id = start_import_job(current_app._get_current_object(), 'ecard_deliveries',
+                                  request.files['csv_file'],
+                                  result_url=url_for('ecard_deliveries', year=delivery_year),
+                                  year=delivery_year)
 
-        db.session.commit()
+        return redirect(url_for('import_job', job_id=job_id))
 
-        flash(f'Imported {imported_count} new deliveries, updated {updated_count} for {delivery_year}. Skipped {skipped_count}.', 'success')
-        if errors:
-            flash(f'Errors: {"; ".join(errors[:5])}', 'warning')
+    return render_template('import_ecard_deliveries.html', form=form, default_year=default_year)
 
-        return redirect(url_for('ecard_deliveries', year=delivery_year))
 
-    return render_template('import_ecard_deliveries.html', form=form, default_year=default_year)
+@route('/import/jobs/<job_id>')
+def import_job(job_id):
+    """Progress page for a background CSV import."""
+    job = ImportJob.query.get_or_404(job_id)
+    return render_template('import_job.html', job=job)
+
+
+@route('/api/import-jobs/<job_id>', methods=['GET'])
+def api_import_job(job_id):
+    """AJAX endpoint to poll the status of a background CSV import."""
+    job = ImportJob.query.get(job_id)
+    if not job:
+        return jsonify({'success': False, 'error': 'Import job not found'}), 404
 
+    return jsonify({'success': True, 'job': job.to_dict()})
 
-@app.route('/shopping-list')
+
+@route('/shopping-list')
 def shopping_list():
     """View all people who get gifts and their ideas."""
     active_year = get_active_year()
@@ -447,27 +582,16 @@ def shopping_list():
     # Get all people who get gifts
     people = Person.query.filter_by(active=True, gets_gift=True).order_by(Person.name).all()
 
-    # For each person, get their gift ideas and task status
+    # Load ideas and task status for every recipient at once
+    recipient_ids = db.select(Person.id).filter_by(active=True, gets_gift=True)
+    ideas_by_person = load_unused_gift_ideas(recipient_ids)
+    tasks = load_tasks(recipient_ids, active_year, ['gift_purchased', 'gift_given'])
+
     shopping_data = []
     for person in people:
-        # Get unused gift ideas
-        ideas = GiftIdea.query.filter_by(
-            person_id=person.id,
-            used_year=None
-        ).order_by(GiftIdea.added_date.desc()).all()
-
-        # Get task status for current year
-        purchased_task = Task.query.filter_by(
-            person_id=person.id,
-            year=active_year,
-            task_type='gift_purchased'
-        ).first()
-
-        given_task = Task.query.filter_by(
-            person_id=person.id,
-            year=active_year,
-            task_type='gift_given'
-        ).first()
+        ideas = ideas_by_person.get(person.id, [])
+        purchased_task = tasks.get((person.id, 'gift_purchased'))
+        given_task = tasks.get((person.id, 'gift_given'))
 
         shopping_data.append({
             'person': person,
@@ -481,7 +605,7 @@ def shopping_list():
                            active_year=active_year)
 
 
-@app.route('/writing-queue')
+@route('/writing-queue')
 def writing_queue():
     """View all people getting handwritten cards."""
     active_year = get_active_year()
@@ -490,40 +614,30 @@ def writing_queue():
     people = Person.query.filter_by(
         active=True,
         card_preference='Handwritten'
-    ).order_by(Person.name).all()
-
-    # For each person, get card writing status
-    writing_data = []
-    for person in people:
-        card_task = Task.query.filter_by(
-            person_id=person.id,
-            year=active_year,
-            task_type='card_written'
-        ).first()
+    ).order_by(Person.name)
 
-        writing_data.append({
-            'person': person,
-            'completed': card_task.completed if card_task else False,
-            'task_id': card_task.id if card_task else None
-        })
+    # Card writing status for the whole queue in one joined query
+    writing_data = load_people_with_task_status(people, active_year, 'card_written')
 
     return render_template('writing_queue.html',
                            writing_data=writing_data,
                            active_year=active_year)
 
 
-@app.route('/milestones')
+@route('/milestones')
 def milestones():
     """View and manage milestones."""
     active_year = get_active_year()
-    milestones = Milestone.query.filter_by(year=active_year).order_by(Milestone.phase).all()
+    milestones = Milestone.query.filter_by(year=active_year).options(
+        db.selectinload(Milestone.subtasks)
+    ).order_by(Milestone.phase).all()
 
     return render_template('milestones.html',
                            milestones=milestones,
                            active_year=active_year)
 
 
-@app.route('/milestones/<int:id>/toggle', methods=['POST'])
+@route('/milestones/<int:id>/toggle', methods=['POST'])
 def milestone_toggle(id):
     """Toggle milestone completion."""
     milestone = Milestone.query.get_or_404(id)
@@ -539,7 +653,7 @@ def milestone_toggle(id):
     })
 
 
-@app.route('/milestones/<int:id>/update-link', methods=['POST'])
+@route('/milestones/<int:id>/update-link', methods=['POST'])
 def milestone_update_link(id):
     """Update milestone AI chat link."""
     milestone = Milestone.query.get_or_404(id)
@@ -556,52 +670,60 @@ def milestone_update_link(id):
     })
 
 
-@app.route('/milestones/<int:id>/toggle-subtask', methods=['POST'])
+@route('/milestones/<int:id>/toggle-subtask', methods=['POST'])
 def milestone_toggle_subtask(id):
-    """Toggle a subtask completion for a milestone."""
-    milestone = Milestone.query.get_or_404(id)
+    """Toggle a subtask completion for a milestone.
+
+    Each statement is a single atomic UPDATE, so concurrent clicks on
+    different subtasks can't overwrite each other. Pass ``completed`` to
+    set the state explicitly instead of flipping it.
+    """
     data = request.get_json()
     subtask_index = data.get('subtask_index')
 
     if subtask_index is None:
         return jsonify({'success': False, 'error': 'Missing subtask_index'}), 400
 
-    # Initialize completed_subtasks if None
-    if milestone.completed_subtasks is None:
-        milestone.completed_subtasks = []
-
-    # Toggle the subtask
-    if subtask_index in milestone.completed_subtasks:
-        milestone.completed_subtasks.remove(subtask_index)
+    subtask_filter = db.and_(MilestoneSubtask.milestone_id == id, MilestoneSubtask.position == subtask_index)
+    if 'completed' in data:
+        new_state = bool(data['completed'])
     else:
-        milestone.completed_subtasks.append(subtask_index)
-
-    # Mark the field as modified so SQLAlchemy detects the change
-    flag_modified(milestone, 'completed_subtasks')
-
-    # Check if all subtasks are complete
-    total_subtasks = len(milestone.subtasks) if milestone.subtasks else 0
-    all_complete = len(milestone.completed_subtasks) == total_subtasks and total_subtasks > 0
-
-    # Auto-complete milestone if all subtasks done
-    if all_complete and not milestone.completed:
-        milestone.completed = True
-        milestone.completed_date = date.today()
-    elif not all_complete and milestone.completed:
-        # Uncomplete if user unchecks a subtask
-        milestone.completed = False
-        milestone.completed_date = None
-
+        new_state = db.not_(MilestoneSubtask.completed)
+    toggled = db.session.execute(
+        db.update(MilestoneSubtask).where(subtask_filter).values(completed=new_state)
+        .returning(MilestoneSubtask.id)
+    ).first()
+    if not toggled:
+        db.session.rollback()
+        abort(404)
+
+    # Auto-complete the milestone when all subtasks are done, uncomplete otherwise
+    all_complete = db.select(
+        db.func.count() == db.func.sum(db.case((MilestoneSubtask.completed == True, 1), else_=0))
+    ).where(MilestoneSubtask.milestone_id == id).scalar_subquery()
+    milestone_completed = db.session.execute(
+        db.update(Milestone).where(Milestone.id == id).values(
+            completed=all_complete,
+            completed_date=db.case((all_complete, db.func.coalesce(Milestone.completed_date, date.today())),
+                                   else_=None)
+        ).returning(Milestone.completed)
+    ).scalar_one()
+
+    completed_subtasks = db.session.scalars(
+        db.select(MilestoneSubtask.position).where(
+            MilestoneSubtask.milestone_id == id, MilestoneSubtask.completed == True
+        ).order_by(MilestoneSubtask.position)
+    ).all()
     db.session.commit()
 
     return jsonify({
         'success': True,
-        'completed_subtasks': milestone.completed_subtasks,
-        'milestone_completed': milestone.completed
+        'completed_subtasks': completed_subtasks,
+        'milestone_completed': milestone_completed
     })
 
 
-@app.route('/archive-year', methods=['POST'])
+@route('/archive-year', methods=['POST'])
 def archive_year():
     """Manually archive the current year and roll over to the next."""
     active_year = get_active_year()
@@ -625,87 +747,70 @@ def archive_year():
     return redirect(url_for('dashboard'))
 
 
-@app.route('/archive')
+def _archive_list_version():
+    """Cache key for the archive list: its snapshots, and today for the active year."""
+    count, newest = archive_list_version()
+    midnight = datetime.combine(date.today(), datetime.min.time())
+    return f'{count}|{newest}|{midnight}', max(newest or midnight, midnight)
+
+
+def _archive_detail_version(year):
+    """Cache key for an archived year: when its snapshot was last written."""
+    written = archive_snapshot_version(year)
+    return None if written is None else (f'{year}|{written}', written)
+
+
+@route('/archive')
+@conditional(version=_archive_list_version)
 def archive_list():
     """View list of archived years."""
-    summaries = AnnualSummary.query.order_by(AnnualSummary.year.desc()).all()
+    summaries = list_archive_summaries()
     active_year = get_active_year()
 
     return render_template('archive_list.html', summaries=summaries, active_year=active_year)
 
 
-@app.route('/archive/<int:year>')
+@route('/archive/<int:year>')
+@conditional(store=True, version=_archive_detail_version)
 def archive_detail(year):
     """View details of a specific archived year."""
-    summary = AnnualSummary.query.filter_by(year=year).first_or_404()
-
-    # Get all tasks for this year
-    tasks = Task.query.filter_by(year=year).all()
-
-    # Get milestones for this year
-    milestones = Milestone.query.filter_by(year=year).order_by(Milestone.phase).all()
-
-    # Get people who received gifts
-    gift_recipients = []
-    gift_tasks = Task.query.filter_by(
-        year=year,
-        task_type='gift_given',
-        completed=True
-    ).all()
-
-    for task in gift_tasks:
-        if task.person:
-            gift_recipients.append({
-                'person': task.person,
-                'gift': task.actual_gift or 'No details recorded'
-            })
-
-    # Get e-card delivery stats for this year
-    total_deliveries = EcardDelivery.query.filter_by(year=year).count()
-    messages_received = EcardDelivery.query.filter(
-        EcardDelivery.year == year,
-        EcardDelivery.message.isnot(None),
-        EcardDelivery.message != ''
-    ).count()
-    bounced_count = EcardDelivery.query.filter_by(year=year, status='Bounced').count()
+    # Everything on the page was frozen when the year was archived
+    snapshot = get_archive_snapshot(year)
+    if snapshot is None:
+        abort(404)
 
     return render_template('archive_detail.html',
-                           summary=summary,
-                           milestones=milestones,
-                           gift_recipients=gift_recipients,
-                           total_deliveries=total_deliveries,
-                           messages_received=messages_received,
-                           bounced_count=bounced_count)
+                           summary=snapshot['summary'],
+                           milestones=snapshot['milestones'],
+                           gift_recipients=snapshot['gift_recipients'],
+                           total_deliveries=snapshot['deliveries']['total'],
+                           messages_received=snapshot['deliveries']['messages'],
+                           bounced_count=snapshot['deliveries']['bounced'])
 
 
-@app.route('/tasks/create/<int:person_id>/<task_type>', methods=['POST'])
+@route('/tasks/create/<int:person_id>/<task_type>', methods=['POST'])
 def task_create(person_id, task_type):
     """Create a task for a person in the current year."""
     active_year = get_active_year()
 
-    # Check if task already exists
-    existing = Task.query.filter_by(
-        person_id=person_id,
-        year=active_year,
-        task_type=task_type
-    ).first()
-
-    if not existing:
-        task = Task(
+    # Insert, or find the existing task, in one statement
+    task_id = db.session.scalar(
+        sqlite_insert(Task).values(
             person_id=person_id,
             year=active_year,
             task_type=task_type,
             description=f'{task_type} for {active_year}'
-        )
-        db.session.add(task)
-        db.session.commit()
-
-        return jsonify({'success': True, 'task_id': task.id})
+        ).on_conflict_do_update(
+            index_elements=[Task.person_id, Task.year, Task.task_type],
+            set_={'description': Task.description}
+        ).returning(Task.id)
+    )
+    db.session.commit()
 
-    return jsonify({'success': True, 'task_id': existing.id})
+    return jsonify({'success': True, 'task_id': task_id})
 
 
-@app.route('/tasks/<int:id>/toggle', methods=['POST'])
+@route('/tasks/<int:id>/toggle', methods=['POST'])
 def task_toggle(id):
     """Toggle task completion."""
     task = Task.query.get_or_404(id)
@@ -721,7 +826,75 @@ def task_toggle(id):
     })
 
 
-@app.route('/tasks/<int:id>/complete-gift', methods=['POST'])
+@route('/api/tasks/set', methods=['POST'])
+def api_task_set():
+    """AJAX endpoint creating or updating one task for the active year.
+
+    Expects {"person_id": 1, "task_type": "card_written", "completed": true};
+    leave out "completed" to toggle. One atomic upsert, so concurrent clicks
+    can't create duplicate tasks.
+    """
+    data = request.get_json(silent=True) or {}
+    person_id = data.get('person_id')
+    task_type = data.get('task_type')
+    completed = data.get('completed')
+
+    if type(person_id) is not int or task_type not in TASK_TYPES or not isinstance(completed, (bool, type(None))):
+        return jsonify({'success': False, 'error': 'Invalid task'}), 400
+
+    result = set_task_state(person_id, task_type, get_active_year(), completed)
+    if result is None:
+        return jsonify({'success': False, 'error': 'Person not found'}), 404
+    db.session.commit()
+
+    task_id, completed = result
+    return jsonify({'success': True, 'task_id': task_id, 'completed': completed})
+
+
+@route('/api/tasks/batch', methods=['POST'])
+def api_tasks_batch():
+    """AJAX endpoint setting many tasks for the active year in one transaction.
+
+    Expects {"mutations": [{"person_id": 1, "task_type": "card_written",
+    "completed": true}, ...]}. Tasks that don't exist yet are created.
+    """
+    data = request.get_json(silent=True) or {}
+    mutations = data.get('mutations')
+
+    if not isinstance(mutations, list) or not mutations:
+        return jsonify({'success': False, 'error': 'Missing mutations'}), 400
+    if len(mutations) > current_app.config['TASK_BATCH_LIMIT']:
+        return jsonify({'success': False, 'error': 'Too many mutations'}), 400
+
+    parsed = []
+    for mutation in mutations:
+        if not isinstance(mutation, dict):
+            return jsonify({'success': False, 'error': 'Invalid mutation'}), 400
+        person_id = mutation.get('person_id')
+        task_type = mutation.get('task_type')
+        completed = mutation.get('completed')
+        if type(person_id) is not int or task_type not in TASK_TYPES or not isinstance(completed, bool):
+            return jsonify({'success': False, 'error': 'Invalid mutation'}), 400
+        parsed.append((person_id, task_type, completed))
+
+    # Every person must exist
+    person_ids = {person_id for person_id, _, _ in parsed}
+    found = set(db.session.scalars(db.select(Person.id).where(Person.id.in_(person_ids))))
+    if found != person_ids:
+        return jsonify({'success': False, 'error': 'Person not found',
+                        'person_ids': sorted(person_ids - found)}), 404
+
+    results = apply_task_mutations(parsed, get_active_year())
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'tasks': [{'person_id': person_id, 'task_type': task_type, 'task_id': task_id, 'completed': completed}
+                  for (person_id, task_type), (task_id, completed) in results.items()]
+    })
+
+
+@route('/tasks/<int:id>/complete-gift', methods=['POST'])
 def complete_gift_task(id):
     """Mark a gift as given with details."""
     task = Task.query.get_or_404(id)
@@ -738,7 +911,7 @@ def complete_gift_task(id):
     return redirect(request.referrer or url_for('dashboard'))
 
 
-@app.route('/api/quick-add-idea', methods=['POST'])
+@route('/api/quick-add-idea', methods=['POST'])
 def api_quick_add_idea():
     """AJAX endpoint for quick gift idea entry."""
     data = request.get_json()
@@ -768,10 +941,10 @@ def api_quick_add_idea():
     })
 
 
-@app.route('/api/rollover-check', methods=['GET'])
+@route('/api/rollover-check', methods=['GET'])
 def api_rollover_check():
-    """AJAX endpoint to check if rollover is needed."""
-    rollover_summary = check_and_perform_rollover()
+    """AJAX endpoint to check if the scheduler has archived a year."""
+    rollover_summary = pending_rollover_notice()
 
     if rollover_summary:
         return jsonify({
@@ -782,7 +955,14 @@ def api_rollover_check():
     return jsonify({'rollover_needed': False})
 
 
-@app.route('/ecard-deliveries')
+@route('/api/cache-stats', methods=['GET'])
+def api_cache_stats():
+    """AJAX endpoint with hit/miss counters for the active year cache."""
+    return jsonify({'success': True, 'active_year': active_year_cache_info()})
+
+
+@route('/ecard-deliveries')
+@conditional()
 def ecard_deliveries():
     """View e-card delivery status for all people."""
     # Get year from query param, or default to most recent season
@@ -795,7 +975,9 @@ def ecard_deliveries():
     selected_year = request.args.get('year', default_year, type=int)
 
     # Get all deliveries for selected year
-    deliveries = EcardDelivery.query.filter_by(year=selected_year).all()
+    deliveries = EcardDelivery.query.filter_by(year=selected_year).options(
+        db.joinedload(EcardDelivery.person)
+    ).all()
 
     # Group by person
     delivery_data = {}
@@ -821,7 +1003,8 @@ def ecard_deliveries():
                            available_years=available_years)
 
 
-@app.route('/contact-issues')
+@route('/contact-issues')
+@conditional()
 def contact_issues():
     """View people with bounced e-cards who need contact info updates."""
     # Get year from query param, or default to most recent season
@@ -837,7 +1020,7 @@ def contact_issues():
     bounced_deliveries = EcardDelivery.query.filter_by(
         year=selected_year,
         status='Bounced'
-    ).all()
+    ).options(db.joinedload(EcardDelivery.person)).all()
 
     # Group by person to avoid duplicates
     people_with_issues = {}
@@ -866,7 +1049,8 @@ def contact_issues():
                            available_years=available_years)
 
 
-@app.route('/ecard-messages')
+@route('/ecard-messages')
+@conditional()
 def ecard_messages():
     """View all messages received from e-card recipients."""
     # Get year from query param, or default to most recent season
@@ -883,7 +1067,7 @@ def ecard_messages():
         EcardDelivery.year == selected_year,
         EcardDelivery.message.isnot(None),
         EcardDelivery.message != ''
-    ).order_by(EcardDelivery.imported_date.desc()).all()
+    ).options(db.joinedload(EcardDelivery.person)).order_by(EcardDelivery.imported_date.desc()).all()
 
     # Get available years for year selector
     available_years = db.session.query(EcardDelivery.year).distinct().order_by(EcardDelivery.year.desc()).all()
@@ -895,11 +1079,17 @@ def ecard_messages():
                            available_years=available_years)
 
 
-@app.route('/about')
+@route('/metrics')
+def metrics():
+    """Per-endpoint request metrics in the Prometheus text format."""
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+
+@route('/about')
 def about():
     """About page."""
     return render_template('about.html')
 
 
 if __name__ == '__main__':
-    app.run(debug=True, port=7234)
+    create_app().run(debug=True, port=7234)
@@ -0,0 +1,151 @@
+"""Precomputed snapshots of archived years.
+
+An archived year's tasks and milestones never change again, so the year
+rollover writes one archive_snapshots row holding everything the archive
+pages show: the annual summary, milestones, gift recipients with their
+gifts, and e-card delivery counts. The archive pages read that row instead
+of querying tasks, milestones and people.
+
+Snapshots are not rewritten afterwards, except for the delivery counts:
+Paperless Post results for a year are often imported after it has been
+archived, so the delivery importer refreshes them. Every write stamps
+created_at, which is what the archive pages' ETags are keyed by (see
+http_cache.py).
+"""
+from datetime import datetime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, AnnualSummary, ArchiveSnapshot, Milestone, Person, Task
+from rollups import get_year_rollup
+
+# Bump when the snapshot layout changes; older snapshots are then rebuilt
+SNAPSHOT_VERSION = 1
+
+_REFRESH_DELIVERIES = db.text(
+    "UPDATE archive_snapshots SET data = json_set(data, '$.deliveries', json_object("
+    "'total', year_rollups.deliveries, 'messages', year_rollups.messages, 'bounced', year_rollups.bounces)), "
+    "created_at = :created_at "
+    "FROM year_rollups WHERE year_rollups.year = archive_snapshots.year AND archive_snapshots.year = :year"
+)
+
+
+def build_archive_snapshot(year):
+    """Collect everything shown for an archived year into a JSON-able dict.
+
+    Expects the year's AnnualSummary to exist (flushed, if in the same
+    transaction).
+    """
+    summary = db.session.execute(
+        db.select(AnnualSummary.year, AnnualSummary.total_people, AnnualSummary.gifts_given,
+                  AnnualSummary.handwritten_cards, AnnualSummary.ecards_sent, AnnualSummary.completed_date)
+        .where(AnnualSummary.year == year)
+    ).one()
+
+    milestones = db.session.execute(
+        db.select(Milestone.phase, Milestone.completed, Milestone.completed_date)
+        .where(Milestone.year == year).order_by(Milestone.phase)
+    ).all()
+
+    # Names as they were when the year was archived
+    gift_recipients = db.session.execute(
+        db.select(Person.id, Person.name, Task.actual_gift)
+        .join(Person, Task.person_id == Person.id)
+        .where(Task.year == year, Task.task_type == 'gift_given', Task.completed == True)
+        .order_by(Task.id)
+    ).all()
+
+    rollup = get_year_rollup(year)
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'summary': {
+            'year': summary.year,
+            'total_people': summary.total_people,
+            'gifts_given': summary.gifts_given,
+            'handwritten_cards': summary.handwritten_cards,
+            'ecards_sent': summary.ecards_sent,
+            'completed_date': summary.completed_date.isoformat() if summary.completed_date else None,
+        },
+        'milestones': [{
+            'phase': milestone.phase,
+            'completed': bool(milestone.completed),
+            'completed_date': milestone.completed_date.isoformat() if milestone.completed_date else None,
+        } for milestone in milestones],
+        'gift_recipients': [{
+            'person_id': person_id,
+            'name': name,
+            'gift': actual_gift or 'No details recorded',
+        } for person_id, name, actual_gift in gift_recipients],
+        'deliveries': {'total': rollup.deliveries, 'messages': rollup.messages, 'bounced': rollup.bounces},
+    }
+
+
+def write_archive_snapshot(year, replace=False):
+    """Snapshot an archived year. Does not commit.
+
+    An existing snapshot is kept unless ``replace`` is set, so concurrent
+    writers can't fail on each other.
+    """
+    insert = sqlite_insert(ArchiveSnapshot).values(year=year, data=build_archive_snapshot(year))
+    if replace:
+        insert = insert.on_conflict_do_update(
+            index_elements=[ArchiveSnapshot.year],
+            set_={'data': insert.excluded.data, 'created_at': insert.excluded.created_at}
+        )
+    else:
+        insert = insert.on_conflict_do_nothing()
+    db.session.execute(insert)
+
+
+def backfill_archive_snapshots(rebuild=False):
+    """Snapshot archived years that have no (current) snapshot.
+
+    With ``rebuild``, every archived year is snapshotted again. Returns the
+    years written.
+    """
+    query = db.select(AnnualSummary.year).order_by(AnnualSummary.year)
+    if not rebuild:
+        current = db.select(ArchiveSnapshot.year).where(
+            db.func.json_extract(ArchiveSnapshot.data, '$.version') == SNAPSHOT_VERSION
+        )
+        query = query.where(AnnualSummary.year.not_in(current))
+
+    years = db.session.scalars(query).all()
+    for year in years:
+        write_archive_snapshot(year, replace=True)
+    db.session.commit()
+    return years
+
+
+def refresh_snapshot_deliveries(year):
+    """Update a snapshot's e-card delivery counts from the year's rollup.
+
+    A no-op when the year has no snapshot. Does not commit.
+    """
+    db.session.execute(_REFRESH_DELIVERIES, {'year': year, 'created_at': datetime.utcnow()})
+
+
+def get_archive_snapshot(year):
+    """Return the snapshot dict for an archived year, or None."""
+    return db.session.scalar(db.select(ArchiveSnapshot.data).where(ArchiveSnapshot.year == year))
+
+
+def list_archive_summaries():
+    """Return every archived year's summary dict, newest first.
+
+    Only the summary is read out of each snapshot.
+    """
+    return db.session.scalars(
+        db.select(ArchiveSnapshot.data['summary']).order_by(ArchiveSnapshot.year.desc())
+    ).all()
+
+
+def archive_snapshot_version(year):
+    """Return when a year's snapshot was last written, or None if it has none."""
+    return db.session.scalar(db.select(ArchiveSnapshot.created_at).where(ArchiveSnapshot.year == year))
+
+
+def archive_list_version():
+    """Return (snapshot count, newest created_at) over all snapshots."""
+    return db.session.execute(
+        db.select(db.func.count(), db.func.max(ArchiveSnapshot.created_at))
+    ).one()
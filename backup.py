@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""Online backups of the SQLite database.
+
+Snapshots are taken with SQLite's online backup API, so they are consistent
+even while the server is writing, and nothing has to be stopped. Each
+snapshot is checked with PRAGMA integrity_check, gzip-compressed into
+backups/, and old snapshots are pruned with an hourly/daily/weekly
+retention policy.
+
+    python backup.py create              # one snapshot, then prune
+    python backup.py list
+    python backup.py restore backups/database_20251225_120000.db.gz
+    python backup.py schedule --interval 3600
+
+backup.sh and restore.sh are thin wrappers around this module.
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.join(ROOT, 'instance', 'database.db')
+BACKUPS_DIR = os.path.join(ROOT, 'backups')
+
+SNAPSHOT_PREFIX = 'database_'
+SAFETY_PREFIX = 'database_before_restore_'  # Never pruned automatically
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S'
+
+# Default retention: newest snapshot per hour for a day, per day for a
+# week, and per ISO week for a month
+DEFAULT_RETENTION = {'hourly': 24, 'daily': 7, 'weekly': 4}
+
+
+class BackupError(Exception):
+    pass
+
+
+def integrity_check(path):
+    """Raise BackupError unless PRAGMA integrity_check reports ok."""
+    connection = sqlite3.connect(path)
+    try:
+        result = connection.execute('PRAGMA integrity_check').fetchone()[0]
+    finally:
+        connection.close()
+    if result != 'ok':
+        raise BackupError(f'Integrity check failed for {path}: {result}')
+
+
+def create_snapshot(db_file=DB_FILE, backups_dir=BACKUPS_DIR, prefix=SNAPSHOT_PREFIX):
+    """Write a verified, compressed snapshot of the database.
+
+    Returns a dict with the snapshot path, duration in seconds, and the
+    database and compressed sizes in bytes.
+    """
+    if not os.path.exists(db_file):
+        raise BackupError(f'Database file not found at {db_file}')
+    os.makedirs(backups_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    path = os.path.join(backups_dir, f'{prefix}{datetime.now().strftime(TIMESTAMP_FORMAT)}.db.gz')
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=backups_dir)
+    os.close(fd)
+    try:
+        # Online backup: a consistent copy, taken while readers and writers carry on
+        source = sqlite3.connect(db_file)
+        target = sqlite3.connect(raw_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+
+        integrity_check(raw_path)
+        database_size = os.path.getsize(raw_path)
+
+        with open(raw_path, 'rb') as raw, gzip.open(path + '.part', 'wb') as compressed:
+            shutil.copyfileobj(raw, compressed)
+        os.replace(path + '.part', path)
+    finally:
+        for leftover in (raw_path, path + '.part'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+    return {
+        'path': path,
+        'duration': time.perf_counter() - start,
+        'database_size': database_size,
+        'size': os.path.getsize(path),
+    }
+
+
+def _snapshot_time(filename):
+    """Timestamp encoded in a backup filename, or None if it isn't a backup."""
+    if not filename.startswith(SNAPSHOT_PREFIX):
+        return None
+    stamp = filename[len(SNAPSHOT_PREFIX):].split('.', 1)[0]
+    if stamp.startswith('before_restore_'):
+        stamp = stamp[len('before_restore_'):]
+    try:
+        return datetime.strptime(stamp, TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def list_snapshots(backups_dir=BACKUPS_DIR):
+    """Return [(created, path)] for every backup, newest first.
+
+    Includes uncompressed .db backups made by older versions of backup.sh.
+    """
+    if not os.path.isdir(backups_dir):
+        return []
+    snapshots = []
+    for filename in os.listdir(backups_dir):
+        created = _snapshot_time(filename)
+        if created and (filename.endswith('.db') or filename.endswith('.db.gz')):
+            snapshots.append((created, os.path.join(backups_dir, filename)))
+    return sorted(snapshots, reverse=True)
+
+
+def prune_snapshots(backups_dir=BACKUPS_DIR, retention=DEFAULT_RETENTION):
+    """Delete compressed snapshots not kept by the retention policy.
+
+    The newest snapshot in each of the last N hours, days and ISO weeks is
+    kept. Safety backups and old uncompressed backups are never deleted.
+    Returns the list of deleted paths.
+    """
+    buckets = {
+        'hourly': lambda created: created.strftime('%Y%m%d%H'),
+        'daily': lambda created: created.strftime('%Y%m%d'),
+        'weekly': lambda created: created.strftime('%G%V'),
+    }
+    candidates = [(created, path) for created, path in list_snapshots(backups_dir)
+                  if path.endswith('.gz') and not os.path.basename(path).startswith(SAFETY_PREFIX)]
+
+    keep = set()
+    for period, bucket_of in buckets.items():
+        seen = set()
+        for created, path in candidates:  # Newest first, so the first per bucket wins
+            bucket = bucket_of(created)
+            if bucket not in seen and len(seen) < retention.get(period, 0):
+                seen.add(bucket)
+                keep.add(path)
+
+    deleted = []
+    for _, path in candidates:
+        if path not in keep:
+            os.remove(path)
+            deleted.append(path)
+    return deleted
+
+
+def restore_snapshot(snapshot, db_file=DB_FILE, backups_dir=BACKUPS_DIR):
+    """Replace the database with a snapshot, after verifying it.
+
+    The current database is saved first as a safety backup, whose path is
+    returned (None if there was no database). Restart the server afterwards.
+    """
+    fd, raw_path = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(db_file))
+    os.close(fd)
+    try:
+        opener = gzip.open if snapshot.endswith('.gz') else open
+        with opener(snapshot, 'rb') as source, open(raw_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        integrity_check(raw_path)
+
+        safety = None
+        if os.path.exists(db_file):
+            safety = create_snapshot(db_file, backups_dir, prefix=SAFETY_PREFIX)['path']
+
+        # Drop WAL files that belong to the old database, then swap atomically
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(db_file + suffix):
+                os.remove(db_file + suffix)
+        os.replace(raw_path, db_file)
+        return safety
+    finally:
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+
+def _format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def backup_once(args):
+    """Create one snapshot and prune; prints a report. Returns an exit code."""
+    try:
+        result = create_snapshot(args.db, args.backups_dir)
+    except (BackupError, sqlite3.Error) as e:
+        print(f'✗ Backup failed: {e}')
+        return 1
+
+    deleted = prune_snapshots(args.backups_dir, {
+        'hourly': args.keep_hourly, 'daily': args.keep_daily, 'weekly': args.keep_weekly
+    })
+    print(f"✓ Backup created successfully: {os.path.relpath(result['path'])}")
+    print(f"  Duration: {result['duration']:.2f}s")
+    print(f"  Size: {_format_size(result['size'])} "
+          f"(database {_format_size(result['database_size'])}, integrity ok)")
+    if deleted:
+        print(f'  Pruned {len(deleted)} old snapshot(s)')
+    print(f'  Total backups: {len(list_snapshots(args.backups_dir))}')
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default=DB_FILE, help='database file (default: instance/database.db)')
+    parser.add_argument('--backups-dir', default=BACKUPS_DIR)
+    parser.add_argument('--keep-hourly', type=int, default=DEFAULT_RETENTION['hourly'])
+    parser.add_argument('--keep-daily', type=int, default=DEFAULT_RETENTION['daily'])
+    parser.add_argument('--keep-weekly', type=int, default=DEFAULT_RETENTION['weekly'])
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create', help='take a snapshot now, then prune')
+    list_parser = commands.add_parser('list', help='list snapshots, newest first')
+    list_parser.add_argument('--paths', action='store_true', help='print only paths, one per line')
+    restore_parser = commands.add_parser('restore', help='restore a snapshot over the database')
+    restore_parser.add_argument('snapshot')
+    commands.add_parser('prune', help='apply the retention policy')
+    schedule_parser = commands.add_parser('schedule', help='take snapshots forever at an interval')
+    schedule_parser.add_argument('--interval', type=int, default=3600, help='seconds between snapshots')
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        sys.exit(backup_once(args))
+
+    elif args.command == 'list':
+        for i, (created, path) in enumerate(list_snapshots(args.backups_dir)):
+            if args.paths:
+                print(path)
+            else:
+                print(f'  [{i}] {os.path.basename(path)}')
+                print(f"      Created: {created:%Y-%m-%d %H:%M:%S}")
+                print(f'      Size: {_format_size(os.path.getsize(path))}')
+                print()
+
+    elif args.command == 'restore':
+        try:
+            safety = restore_snapshot(args.snapshot, args.db, args.backups_dir)
+        except (BackupError, OSError, sqlite3.Error) as e:
+            print(f'✗ Restore failed: {e}')
+            sys.exit(1)
+        if safety:
+            print(f'✓ Safety backup created: {os.path.relpath(safety)}')
+        print('✓ Database restored successfully!')
+        print()
+        print('Restart the Flask server to use the restored database.')
+
+    elif args.command == 'prune':
+        deleted = prune_snapshots(args.backups_dir, {
+            'hourly': args.keep_hourly, 'daily': args.keep_daily, 'weekly': args.keep_weekly
+        })
+        print(f'Pruned {len(deleted)} snapshot(s)')
+
+    elif args.command == 'schedule':
+        print(f'Taking a snapshot every {args.interval}s (Ctrl+C to stop)')
+        while True:
+            backup_once(args)
+            time.sleep(args.interval)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,14 @@
 #!/bin/bash
 # Backup script for Be Thoughtful database
+#
+# Takes a consistent online snapshot (safe while the server is running),
+# verifies it, compresses it into backups/ and prunes old snapshots.
+# Extra arguments are passed to backup.py, e.g. --keep-daily 14.
+# Run ./backup.sh schedule --interval 3600 to keep taking snapshots.
 
-# Create backups directory if it doesn't exist
-mkdir -p backups
+cd "$(dirname "$0")"
 
-# Get current timestamp
-TIMESTAMP=$(date +"%Y%m%d_%H%M%S")
-
-# Database file
-DB_FILE="instance/database.db"
-
-# Check if database exists
-if [ ! -f "$DB_FILE" ]; then
-    echo "Error: Database file not found at $DB_FILE"
-    exit 1
-fi
-
-# Create backup
-BACKUP_FILE="backups/database_${TIMESTAMP}.db"
-cp "$DB_FILE" "$BACKUP_FILE"
-
-if [ $? -eq 0 ]; then
-    echo "✓ Backup created successfully: $BACKUP_FILE"
-
-    # Show backup size
-    SIZE=$(du -h "$BACKUP_FILE" | cut -f1)
-    echo "  Size: $SIZE"
-
-    # Count total backups
-    BACKUP_COUNT=$(ls -1 backups/*.db 2>/dev/null | wc -l)
-    echo "  Total backups: $BACKUP_COUNT"
-else
-    echo "✗ Backup failed!"
-    exit 1
+if [ $# -eq 0 ] || [[ "$1" == -* ]]; then
+    exec python3 backup.py "$@" create
 fi
+exec python3 backup.py "$@"
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark: import cost and time to first response.
+
+Each run starts a fresh interpreter against an empty throwaway database and
+measures how long `import app` takes, then how long building the app and
+its first GET / take (which includes creating the schema and seeding
+milestones). The slowest modules from `python -X importtime` are listed to
+show where import time goes. Exits non-zero if the median of either measurement is over budget,
+so it can gate a change:
+
+    python benchmarks/cold_start.py --runs 5 --import-budget-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child interpreter; prints timings in milliseconds as JSON
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+response = create_app({'ROLLOVER_SCHEDULER': False}).test_client().get('/')
+responded = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'import_ms': (imported - start) * 1000,
+                  'first_response_ms': (responded - imported) * 1000}))
+"""
+
+
+def run_child(code, extra_args=()):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp}/bench.db')
+        return subprocess.run([sys.executable, *extra_args, '-c', code], cwd=ROOT, env=env,
+                              check=True, capture_output=True, text=True)
+
+
+def slowest_imports(limit):
+    """Return [(cumulative_ms, module)] for the slowest top-level imports."""
+    stderr = run_child('import app', extra_args=['-X', 'importtime']).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # One level of indent below " app" marks a module app.py imports directly
+        if name.startswith('   ') and not name.startswith('    '):
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--import-budget-ms', type=float, default=1500)
+    parser.add_argument('--first-response-budget-ms', type=float, default=1000)
+    parser.add_argument('--top', type=int, default=10, help='slowest imports to list')
+    parser.add_argument('--json', help='also write results to this file')
+    args = parser.parse_args()
+
+    runs = [json.loads(run_child(CHILD).stdout.strip().splitlines()[-1]) for _ in range(args.runs)]
+    results = {
+        key: {
+            'median_ms': round(statistics.median(run[key] for run in runs), 1),
+            'max_ms': round(max(run[key] for run in runs), 1),
+            'budget_ms': budget,
+        }
+        for key, budget in (('import_ms', args.import_budget_ms),
+                            ('first_response_ms', args.first_response_budget_ms))
+    }
+    results['slowest_imports'] = slowest_imports(args.top)
+
+    print(f"{'measurement':<18} {'median ms':>10} {'max ms':>8} {'budget ms':>10}")
+    over_budget = False
+    for key in ('import_ms', 'first_response_ms'):
+        row = results[key]
+        over = row['median_ms'] > row['budget_ms']
+        over_budget |= over
+        print(f"{key:<18} {row['median_ms']:>10} {row['max_ms']:>8} {row['budget_ms']:>10}"
+              f"{'  OVER BUDGET' if over else ''}")
+
+    print('\nSlowest imports from app.py (cumulative ms):')
+    for cumulative_ms, module in results['slowest_imports']:
+        print(f'{cumulative_ms:>8.1f}  {module}')
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""Route-level benchmark suite.
+
+For each data scale, a fresh interpreter fills a throwaway database with
+benchmarks/synthetic_data.py and drives every hot route through the Flask
+test client: the dashboard, people list, shopping list, writing queue,
+archive pages, e-card pages, search, both CSV imports, the toggles and
+the batch task update. For each route it records median and p95 latency,
+the number of SQL statements per request and the peak Python memory
+allocated by one request. Statement counts should not grow with the data; a jump between
+scales usually means an N+1 query.
+
+Results can be written as JSON to diff between commits. The run exits
+non-zero if any route is over its latency or statement budget:
+
+    python benchmarks/routes.py --scales 500 2000 10000 --json before.json
+    python benchmarks/routes.py --budgets budgets.json
+
+A budgets file maps route names to {"p50_ms": ..., "statements": ...};
+routes not listed use the defaults below.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Defaults for every route; statements are per request, at any scale. The
+# shopping list, writing queue and e-card pages render every row, so their
+# latency grows with the data while their statement count must not.
+DEFAULT_BUDGET = {'p50_ms': 1000, 'statements': 25}
+BUDGETS = {
+    'import people': {'p50_ms': 2000, 'statements': 40},
+    'import deliveries': {'p50_ms': 2000, 'statements': 40},
+}
+
+IMPORT_ROWS = 200  # Rows per CSV upload
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def _scenarios(app, rng):
+    """Return {name: callable(client, iteration) -> response} for the routes."""
+    from models import db, Person, Task, MilestoneSubtask, AnnualSummary
+    from synthetic_data import people_csv, deliveries_csv
+    from utils import get_active_year
+
+    with app.app_context():
+        active_year = get_active_year()
+        archived_year = db.session.scalar(db.select(db.func.min(AnnualSummary.year)))
+        task_ids = db.session.scalars(db.select(Task.id).where(Task.year == active_year)).all()
+        subtasks = db.session.execute(db.select(MilestoneSubtask.milestone_id, MilestoneSubtask.position)).all()
+        contacts = db.session.execute(
+            db.select(Person.name, Person.email, Person.phone).where(Person.active == True).limit(IMPORT_ROWS)
+        ).all()
+    deliveries = deliveries_csv(contacts)
+
+    def upload(url, body, **fields):
+        def run(client, iteration):
+            data = {'csv_file': (io.BytesIO(body(iteration)), 'contacts.csv'), **fields}
+            return client.post(url, data=data, content_type='multipart/form-data')
+        return run
+
+    with app.app_context():
+        person_ids = db.session.scalars(db.select(Person.id).where(Person.active == True).limit(IMPORT_ROWS)).all()
+
+    def batch_tasks(client, iteration):
+        return client.post('/api/tasks/batch', json={'mutations': [
+            {'person_id': person_id, 'task_type': 'card_written', 'completed': iteration % 2 == 0}
+            for person_id in person_ids
+        ]})
+
+    def toggle_subtask(client, iteration):
+        milestone_id, position = rng.choice(subtasks)
+        return client.post(f'/milestones/{milestone_id}/toggle-subtask', json={'subtask_index': position})
+
+    return {
+        'dashboard': lambda client, i: client.get('/'),
+        'people': lambda client, i: client.get('/people'),
+        'people sorted by budget': lambda client, i: client.get('/people?sort=budget'),
+        'shopping list': lambda client, i: client.get('/shopping-list'),
+        'writing queue': lambda client, i: client.get('/writing-queue'),
+        'milestones': lambda client, i: client.get('/milestones'),
+        'archive list': lambda client, i: client.get('/archive'),
+        'archive detail': lambda client, i: client.get(f'/archive/{archived_year}'),
+        'ecard deliveries': lambda client, i: client.get(f'/ecard-deliveries?year={archived_year}'),
+        'contact issues': lambda client, i: client.get(f'/contact-issues?year={archived_year}'),
+        'ecard messages': lambda client, i: client.get(f'/ecard-messages?year={archived_year}'),
+        'search': lambda client, i: client.get('/search?q=smith'),
+        'toggle task': lambda client, i: client.post(f'/tasks/{rng.choice(task_ids)}/toggle'),
+        'toggle subtask': toggle_subtask,
+        'batch tasks': batch_tasks,
+        'import people': upload('/import', lambda i: people_csv(IMPORT_ROWS, seed=i)),
+        'import deliveries': upload('/import-ecard-deliveries', lambda i: deliveries, year=active_year),
+    }
+
+
+def run_scale(args):
+    """Child process: generate data at one scale and time every route."""
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event
+    from app import create_app, init_database
+    from models import db
+    from synthetic_data import generate
+
+    app = create_app({'ROLLOVER_SCHEDULER': False, 'WTF_CSRF_ENABLED': False, 'IMPORT_RUN_IN_BACKGROUND': False})
+    init_database(app)
+
+    with app.app_context():
+        start = time.perf_counter()
+        counts = generate(args.people, args.years, args.seed)
+        generate_s = time.perf_counter() - start
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *_: statements.append(1))
+
+    rng = random.Random(args.seed)
+    client = app.test_client()
+    results = {}
+    for name, request in _scenarios(app, rng).items():
+        if args.only and name not in args.only:
+            continue
+        for i in range(args.warmup):
+            request(client, -1 - i)
+
+        latencies, counts_per_request = [], []
+        for i in range(args.iterations):
+            statements.clear()
+            start = time.perf_counter()
+            response = request(client, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+            counts_per_request.append(len(statements))
+            if response.status_code >= 400:
+                raise SystemExit(f'{name}: HTTP {response.status_code}')
+
+        # Memory is measured on its own request; tracing slows everything down
+        tracemalloc.start()
+        request(client, args.iterations)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        results[name] = {
+            'p50_ms': round(statistics.median(latencies), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'statements': max(counts_per_request),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+    print(json.dumps({'rows': counts, 'generate_s': round(generate_s, 2), 'routes': results}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[500, 2000, 10000], help='numbers of people')
+    parser.add_argument('--years', type=int, default=3, help='archived years of history')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', nargs='+', help='route names to run (default: all)')
+    parser.add_argument('--budgets', help='JSON file of per-route budgets')
+    parser.add_argument('--json', help='also write results to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--people', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_scale(args)
+        return
+
+    budgets = dict(BUDGETS)
+    if args.budgets:
+        with open(args.budgets) as f:
+            budgets.update(json.load(f))
+
+    results = {}
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp}/bench.db')
+            command = [sys.executable, __file__, '--child', '--people', str(scale), '--years', str(args.years),
+                       '--iterations', str(args.iterations), '--warmup', str(args.warmup),
+                       '--seed', str(args.seed)]
+            if args.only:
+                command += ['--only', *args.only]
+            output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+            results[str(scale)] = json.loads(output.strip().splitlines()[-1])
+
+    over_budget = []
+    print(f"{'people':>7} {'route':<24} {'p50 ms':>8} {'p95 ms':>8} {'queries':>8} {'peak KiB':>9}")
+    for scale, result in results.items():
+        for name, row in result['routes'].items():
+            budget = {**DEFAULT_BUDGET, **budgets.get(name, {})}
+            over = [key for key in ('p50_ms', 'statements') if row[key] > budget[key]]
+            over_budget.extend(f'{name} at {scale} people: {key} {row[key]} > {budget[key]}' for key in over)
+            print(f"{scale:>7} {name:<24} {row['p50_ms']:>8} {row['p95_ms']:>8} {row['statements']:>8} "
+                  f"{row['peak_kib']:>9}{'  OVER BUDGET' if over else ''}")
+        print(f"{scale:>7} (generated {result['rows']} in {result['generate_s']}s)")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if over_budget:
+        print('\nOver budget:\n  ' + '\n  '.join(over_budget))
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == '__main__':
+    main()
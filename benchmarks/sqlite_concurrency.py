@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Concurrency benchmark for the SQLite connection profile.
+
+Hammers POST /tasks/<id>/toggle from writer threads while reader threads
+load / and /people, against a threaded server on a throwaway database.
+Runs once with SQLite's defaults and once with the app's SQLITE_PRAGMAS,
+then reports p50/p99 latency per endpoint and "database is locked" errors.
+
+    python benchmarks/sqlite_concurrency.py --people 2000 --duration 10
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    'default': '{}',  # SQLite defaults: rollback journal, synchronous=FULL
+    'tuned': None,    # Whatever app.py configures
+}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_profile(args):
+    """Child process: seed a database, serve it, and drive load against it."""
+    sys.path.insert(0, ROOT)
+    from flask import got_request_exception
+    from werkzeug.serving import make_server
+    from app import create_app, init_database
+    from models import db, Person, Task
+    from utils import get_active_year
+
+    app = create_app({'ROLLOVER_SCHEDULER': False})
+    init_database(app)
+
+    locked_errors = []
+
+    def count_locked(sender, exception, **extra):
+        if 'database is locked' in str(exception):
+            locked_errors.append(exception)
+
+    got_request_exception.connect(count_locked, app)
+
+    with app.app_context():
+        year = get_active_year()
+        people = [{'name': f'Person {i:05d}', 'email': f'person{i}@example.com',
+                   'card_preference': random.choice(['Handwritten', 'E-card']),
+                   'gets_gift': random.random() < 0.3} for i in range(args.people)]
+        db.session.execute(db.insert(Person), people)
+        person_ids = [pid for (pid,) in db.session.query(Person.id)]
+        db.session.execute(db.insert(Task), [
+            {'person_id': pid, 'year': year, 'task_type': 'card_written', 'completed': False}
+            for pid in person_ids
+        ])
+        db.session.commit()
+        task_ids = [tid for (tid,) in db.session.query(Task.id)]
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    latencies = {'toggle': [], 'dashboard': [], 'people': []}
+    failures = {name: 0 for name in latencies}
+    deadline = time.monotonic() + args.duration
+
+    def hit(name, url, method='GET'):
+        request = urllib.request.Request(base_url + url, method=method, data=b'' if method == 'POST' else None)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=60) as response:
+                response.read()
+        except urllib.error.HTTPError:
+            failures[name] += 1
+            return
+        latencies[name].append((time.perf_counter() - start) * 1000)
+
+    def writer():
+        while time.monotonic() < deadline:
+            hit('toggle', f'/tasks/{random.choice(task_ids)}/toggle', method='POST')
+
+    def reader():
+        while time.monotonic() < deadline:
+            if random.random() < 0.5:
+                hit('dashboard', '/')
+            else:
+                hit('people', '/people')
+
+    threads = [threading.Thread(target=writer) for _ in range(args.writers)]
+    threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    print(json.dumps({
+        name: {
+            'requests': len(samples),
+            'failed': failures[name],
+            'p50_ms': round(percentile(samples, 50), 1),
+            'p99_ms': round(percentile(samples, 99), 1),
+            'mean_ms': round(statistics.fmean(samples), 1) if samples else 0.0,
+        }
+        for name, samples in latencies.items()
+    } | {'database_locked_errors': len(locked_errors)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--people', type=int, default=2000)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per profile')
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--json', help='also write results to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_profile(args)
+        return
+
+    results = {}
+    for profile, pragmas in PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp}/bench.db')
+            if pragmas is not None:
+                env['FLASK_SQLITE_PRAGMAS'] = pragmas
+            output = subprocess.run(
+                [sys.executable, __file__, '--child', '--people', str(args.people),
+                 '--duration', str(args.duration), '--writers', str(args.writers),
+                 '--readers', str(args.readers)],
+                env=env, check=True, capture_output=True, text=True
+            ).stdout
+            results[profile] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'profile':<9} {'endpoint':<10} {'requests':>9} {'failed':>7} {'p50 ms':>8} {'p99 ms':>8}")
+    for profile, result in results.items():
+        for name in ('toggle', 'dashboard', 'people'):
+            row = result[name]
+            print(f"{profile:<9} {name:<10} {row['requests']:>9} {row['failed']:>7} "
+                  f"{row['p50_ms']:>8} {row['p99_ms']:>8}")
+        print(f"{profile:<9} 'database is locked' errors: {result['database_locked_errors']}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
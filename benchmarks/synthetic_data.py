@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Seeded synthetic data for benchmarks.
+
+Builds N people with a realistic mix of person types, card preferences and
+gift budgets, a few gift ideas each, and M archived years of history before
+the active year: milestones, tasks, e-card deliveries and an annual
+summary per year. The active year gets milestones and partly completed
+tasks. The same seed always produces the same data.
+
+Everything is written with bulk INSERTs, so the search index and year
+rollups are filled by their triggers just as they are for real imports.
+Archived years then get their archive snapshots.
+
+    python benchmarks/synthetic_data.py --people 5000 --years 3 --db /tmp/bench.db
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Chris', 'Karen',
+    'Daniel', 'Lisa', 'Matthew', 'Nancy', 'Anthony', 'Sandra', 'Mark', 'Ashley', 'Steven', 'Emily',
+    'Priya', 'Wei', 'Aisha', 'Mateo', 'Sofia', 'Kenji', 'Fatima', 'Lucas', 'Amara', 'Noah',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+    'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson',
+    'Patel', 'Chen', 'Nguyen', 'Kim', 'Okafor', 'Silva', 'Tanaka', 'Ahmed', 'Muller', 'Rossi',
+]
+GIFT_IDEAS = [
+    'Scented candle', 'Cookbook', 'Wool scarf', 'Coffee sampler', 'Board game', 'Houseplant',
+    'Concert tickets', 'Leather notebook', 'Tea set', 'Puzzle', 'Bluetooth speaker', 'Cozy socks',
+    'Photo book', 'Hot sauce collection', 'Art print', 'Bird feeder', 'Yoga mat', 'Chocolate box',
+]
+MESSAGES = [
+    'Thank you so much, happy holidays!', 'Lovely card, miss you all!', 'Merry Christmas to the family!',
+    'So good to hear from you', 'Happy new year, let us catch up soon',
+]
+
+# (value, weight) mixes for people
+PERSON_TYPES = [('Family', 12), ('Close Friend', 15), ('Neighbor', 8), ('Colleague - Direct Report', 6),
+                ('Colleague - Peer', 12), ('Colleague', 15), ('Former Colleague', 10), ('Professional', 7),
+                ('Other', 15)]
+CARD_PREFERENCES = [('E-card', 60), ('Handwritten', 30), ('None', 10)]
+GIFT_TYPES = {'Family', 'Close Friend', 'Colleague - Direct Report'}  # Most likely to get a gift
+DELIVERY_STATUSES = [('Page viewed', 45), ('Email opened', 25), ('Sent', 20), ('Bounced', 10)]
+
+
+def _pick(rng, weighted):
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights)[0]
+
+
+def _contact(rng, first, last, i):
+    if rng.random() < 0.8:
+        return f'{first}.{last}{i}@example.com'.lower(), None
+    return None, f'555{i % 10000000:07d}'
+
+
+def generate(people=1000, years=3, seed=42):
+    """Fill the current app's database. Returns a dict of row counts.
+
+    Call inside an app context on an initialized, empty database.
+    """
+    from models import db, Person, GiftIdea, Task, AnnualSummary, EcardDelivery
+    from utils import get_active_year, seed_milestones_for_year
+    from duplicates import ensure_match_keys
+    from archives import backfill_archive_snapshots
+
+    rng = random.Random(seed)
+    active_year = get_active_year()
+    past_years = list(range(active_year - years, active_year))
+
+    person_rows = []
+    for i in range(people):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        email, phone = _contact(rng, first, last, i)
+        person_type = _pick(rng, PERSON_TYPES)
+        gets_gift = rng.random() < (0.7 if person_type in GIFT_TYPES else 0.1)
+        person_rows.append({
+            'name': f'{first} {last}',
+            'email': email,
+            'phone': phone,
+            'person_type': person_type,
+            'card_preference': _pick(rng, CARD_PREFERENCES),
+            'gets_gift': gets_gift,
+            'budget': rng.choice([25, 50, 75, 100, 150]) if gets_gift else None,
+            'notes': rng.choice(['', '', 'Loves hiking', 'Allergic to nuts', 'Moved last year', 'Has two kids']),
+            'active': rng.random() > 0.03,
+        })
+    # Ids ascend in row order; asking SQLite for ordered RETURNING costs a statement per row
+    person_ids = sorted(db.session.scalars(db.insert(Person).returning(Person.id), person_rows))
+    people_by_id = dict(zip(person_ids, person_rows))
+
+    idea_rows = [{
+        'person_id': person_id,
+        'idea': rng.choice(GIFT_IDEAS),
+        'added_date': date(active_year - 1, 1, 1) + timedelta(days=rng.randrange(600)),
+        'used_year': rng.choice(past_years) if past_years and rng.random() < 0.3 else None,
+    } for person_id, person in people_by_id.items()
+        for _ in range(rng.randrange(5) if person['gets_gift'] else rng.randrange(2))]
+
+    task_rows = []
+    delivery_rows = []
+    for year in past_years + [active_year]:
+        archived = year != active_year
+        seed_milestones_for_year(year, commit=False)
+        done_rate = 0.95 if archived else 0.4
+        for person_id, person in people_by_id.items():
+            if person['gets_gift']:
+                for task_type in ('gift_purchased', 'gift_given'):
+                    completed = rng.random() < done_rate
+                    task_rows.append({
+                        'person_id': person_id, 'year': year, 'task_type': task_type,
+                        'description': f'{task_type} for {year}', 'completed': completed,
+                        'completed_date': date(year, 12, rng.randrange(1, 25)) if completed else None,
+                        'actual_gift': rng.choice(GIFT_IDEAS) if completed and task_type == 'gift_given' else None,
+                    })
+            if person['card_preference'] != 'None':
+                completed = rng.random() < done_rate
+                task_rows.append({
+                    'person_id': person_id, 'year': year, 'task_type': 'card_written',
+                    'description': f'card_written for {year}', 'completed': completed,
+                    'completed_date': date(year, 12, rng.randrange(1, 25)) if completed else None,
+                    'actual_gift': None,
+                })
+            if archived and person['card_preference'] == 'E-card' and (person['email'] or person['phone']):
+                delivery_rows.append({
+                    'person_id': person_id, 'year': year,
+                    'status': _pick(rng, DELIVERY_STATUSES),
+                    'contact_used': person['email'] or person['phone'],
+                    'contact_type': 'email' if person['email'] else 'sms',
+                    'message': rng.choice(MESSAGES) if rng.random() < 0.15 else None,
+                    'imported_date': date(year, 12, 28),
+                })
+
+    for rows, model in ((idea_rows, GiftIdea), (task_rows, Task), (delivery_rows, EcardDelivery)):
+        if rows:
+            db.session.execute(db.insert(model), rows)
+
+    for year in past_years:
+        db.session.add(AnnualSummary(
+            year=year,
+            total_people=people,
+            gifts_given=sum(1 for t in task_rows
+                            if t['year'] == year and t['task_type'] == 'gift_given' and t['completed']),
+            completed_date=date(year + 1, 1, 2)
+        ))
+    db.session.commit()
+    ensure_match_keys()
+    backfill_archive_snapshots()
+
+    return {'people': len(person_rows), 'gift_ideas': len(idea_rows), 'tasks': len(task_rows),
+            'ecard_deliveries': len(delivery_rows), 'years': len(past_years) + 1}
+
+
+def people_csv(count, seed=0):
+    """A Paperless Post contact export with ``count`` new, unique people."""
+    rng = random.Random(seed)
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=['Full Name', 'Email/Phone Number'])
+    writer.writeheader()
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        writer.writerow({'Full Name': f'{first} {last} {seed}-{i}',
+                         'Email/Phone Number': f'import{seed}-{i}@example.com'})
+    return output.getvalue().encode()
+
+
+def deliveries_csv(people, seed=0):
+    """A Paperless Post recipient list for (name, email, phone) tuples."""
+    rng = random.Random(seed)
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=['Full Name', 'Email/Phone Number', 'Type', 'Status', 'Message'])
+    writer.writeheader()
+    for name, email, phone in people:
+        writer.writerow({
+            'Full Name': name,
+            'Email/Phone Number': email or phone,
+            'Type': 'email' if email else 'sms',
+            'Status': _pick(rng, DELIVERY_STATUSES),
+            'Message': rng.choice(MESSAGES) if rng.random() < 0.15 else '',
+        })
+    return output.getvalue().encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--people', type=int, default=1000)
+    parser.add_argument('--years', type=int, default=3, help='archived years before the active one')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--db', required=True, help='SQLite file to create (must not exist)')
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        sys.exit(f'{args.db} already exists')
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.abspath(args.db)}'
+    sys.path.insert(0, ROOT)
+    from app import create_app, init_database
+
+    app = create_app()
+    init_database(app)
+    with app.app_context():
+        counts = generate(args.people, args.years, args.seed)
+    print(', '.join(f'{count} {name}' for name, count in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Fuzzy duplicate detection for people.
+
+Names and emails are normalized, and every person gets a few blocking keys
+in person_match_keys:
+
+- ``n:<first initial>-<soundex of last name>``, so "Jon Smith",
+  "Jonathan Smith" and "Jon Smyth" share a block
+- ``e:<normalized email>``
+- ``p:<phone digits>``
+
+People are only ever compared with others in the same block, so the
+form-time check costs one indexed lookup and the full report is a single
+pass over the key table rather than an O(n²) comparison of everyone.
+"""
+import re
+import unicodedata
+from types import SimpleNamespace
+from difflib import SequenceMatcher
+from models import db, Person, PersonMatchKey
+
+# Score at or above which two people are reported as likely duplicates
+MATCH_THRESHOLD = 0.85
+
+# Name blocks bigger than this (hundreds of "J. Smith"s) are too unspecific
+# to compare pairwise (the form check reads only this many of them); email
+# and phone blocks are always compared in full
+MAX_BLOCK_SIZE = 200
+
+_HONORIFICS = {'mr', 'mrs', 'ms', 'miss', 'mx', 'dr', 'prof', 'jr', 'sr', 'ii', 'iii', 'iv'}
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys('bfpv', '1'), **dict.fromkeys('cgjkqsxz', '2'),
+    **dict.fromkeys('dt', '3'), 'l': '4', **dict.fromkeys('mn', '5'), 'r': '6'
+}
+
+
+def normalize_name(name):
+    """Lower-case, drop accents, punctuation and honorifics; "Smith, Jon" -> "jon smith"."""
+    if not name:
+        return ''
+    if ',' in name:
+        last, _, first = name.partition(',')
+        name = f'{first} {last}'
+    text = ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+    return ' '.join(word for word in re.findall(r'[a-z0-9]+', text.lower()) if word not in _HONORIFICS)
+
+
+def normalize_email(email):
+    """Lower-case and drop any +tag, so Jon+cards@Example.com matches jon@example.com."""
+    if not email or '@' not in email:
+        return ''
+    local, _, domain = email.strip().lower().rpartition('@')
+    return f"{local.split('+', 1)[0]}@{domain}"
+
+
+def _phone_digits(phone):
+    return re.sub(r'\D', '', phone or '')[-10:]
+
+
+def soundex(word):
+    """American Soundex code for a word, e.g. Smith and Smyth -> s530."""
+    word = re.sub(r'[^a-z]', '', word.lower())
+    if not word:
+        return ''
+    code = word[0]
+    previous = _SOUNDEX_CODES.get(word[0], '')
+    for char in word[1:]:
+        digit = _SOUNDEX_CODES.get(char, '')
+        if digit and digit != previous:
+            code += digit
+        if char not in 'hw':  # h and w don't separate equal codes
+            previous = digit
+    return (code + '000')[:4]
+
+
+def match_keys(name, email, phone):
+    """Return the set of blocking keys for one person."""
+    keys = set()
+    words = normalize_name(name).split()
+    if words:
+        keys.add(f'n:{words[0][0]}-{soundex(words[-1]) or words[-1]}')
+    if normalize_email(email):
+        keys.add(f'e:{normalize_email(email)}')
+    if _phone_digits(phone):
+        keys.add(f'p:{_phone_digits(phone)}')
+    return keys
+
+
+def score_match(a, b):
+    """Score how likely two people are the same, from 0 to 1.
+
+    ``a`` and ``b`` have name, email and phone attributes (Person objects or
+    rows). Returns (score, reasons).
+    """
+    reasons = []
+    if normalize_email(a.email) and normalize_email(a.email) == normalize_email(b.email):
+        reasons.append('same email')
+    if _phone_digits(a.phone) and _phone_digits(a.phone) == _phone_digits(b.phone):
+        reasons.append('same phone')
+
+    name_a, name_b = normalize_name(a.name), normalize_name(b.name)
+    name_score = SequenceMatcher(None, name_a, name_b).ratio() if name_a and name_b else 0.0
+    if name_a and name_b:
+        first_a, last_a = name_a.split()[0], name_a.split()[-1]
+        first_b, last_b = name_b.split()[0], name_b.split()[-1]
+        # Nicknames that are prefixes of the full name: Jon/Jonathan, Chris/Christopher
+        same_last = last_a == last_b or SequenceMatcher(None, last_a, last_b).ratio() >= 0.8
+        if same_last and (first_a.startswith(first_b) or first_b.startswith(first_a)):
+            name_score = max(name_score, 0.9)
+    if name_score >= MATCH_THRESHOLD:
+        reasons.append(f'similar name ({name_score:.0%})')
+
+    # A shared email or phone is a match whatever the names look like
+    score = 1.0 if 'same email' in reasons or 'same phone' in reasons else name_score
+    return score, reasons
+
+
+def index_people(person_ids):
+    """Recompute the match keys of the given people. Does not commit."""
+    person_ids = list(person_ids)
+    for start in range(0, len(person_ids), 500):
+        chunk = person_ids[start:start + 500]
+        db.session.execute(db.delete(PersonMatchKey).where(PersonMatchKey.person_id.in_(chunk)))
+        people = db.session.query(Person.id, Person.name, Person.email, Person.phone).filter(Person.id.in_(chunk))
+        _insert_keys(people)
+
+
+def ensure_match_keys():
+    """Index any person without match keys (new databases, or rows added outside the app)."""
+    missing = db.session.query(Person.id, Person.name, Person.email, Person.phone).filter(
+        ~db.exists().where(PersonMatchKey.person_id == Person.id)
+    )
+    if _insert_keys(missing):
+        db.session.commit()
+
+
+def _insert_keys(people):
+    rows = [{'person_id': person.id, 'key': key}
+            for person in people for key in match_keys(person.name, person.email, person.phone)]
+    if rows:
+        db.session.execute(db.insert(PersonMatchKey), rows)
+    return len(rows)
+
+
+def find_duplicates(name, email=None, phone=None, exclude_id=None, limit=5):
+    """Return likely duplicates among active people for a prospective contact.
+
+    Returns a list of {'person', 'score', 'reasons'} dicts, best match first.
+    """
+    keys = match_keys(name, email, phone)
+    if not keys:
+        return []
+
+    candidates = Person.query.filter(Person.active == True)
+    if exclude_id:
+        candidates = candidates.filter(Person.id != exclude_id)
+
+    def in_blocks(block_keys):
+        return Person.id.in_(db.select(PersonMatchKey.person_id).where(PersonMatchKey.key.in_(block_keys)))
+
+    # Everyone sharing the email or phone is a candidate, however common the
+    # name; a big name block is cut to MAX_BLOCK_SIZE, same name first
+    name_keys = {key for key in keys if key.startswith('n:')}
+    people = {}
+    if keys - name_keys:
+        people.update((person.id, person) for person in candidates.filter(in_blocks(keys - name_keys)))
+    if name_keys:
+        name_block = candidates.filter(in_blocks(name_keys)).order_by(
+            db.case((Person.name == name, 0), else_=1), Person.id
+        ).limit(MAX_BLOCK_SIZE)
+        for person in name_block:
+            people.setdefault(person.id, person)
+
+    prospect = SimpleNamespace(name=name, email=email, phone=phone)
+
+    matches = []
+    for person in people.values():
+        score, reasons = score_match(prospect, person)
+        if score >= MATCH_THRESHOLD:
+            matches.append({'person': person, 'score': score, 'reasons': reasons})
+    matches.sort(key=lambda match: -match['score'])
+    return matches[:limit]
+
+
+def find_all_duplicates(person_ids=None):
+    """Return every likely duplicate pair among active people, best first.
+
+    Each pair is {'a', 'b', 'score', 'reasons'} where a and b are rows with
+    id, name, email and phone. With ``person_ids``, only pairs involving
+    those people are returned (used after an import).
+    """
+    active_keys = db.select(PersonMatchKey.key, PersonMatchKey.person_id).join(
+        Person, Person.id == PersonMatchKey.person_id
+    ).where(Person.active == True)
+
+    # Only keys shared by at least two active people form a block
+    # (subqueries here read person_match_keys independently of the outer query)
+    shared = active_keys.group_by(PersonMatchKey.key).having(db.func.count() > 1).with_only_columns(
+        PersonMatchKey.key
+    ).correlate(None)
+    if person_ids is not None:
+        shared = shared.where(PersonMatchKey.key.in_(
+            db.select(PersonMatchKey.key).where(PersonMatchKey.person_id.in_(person_ids)).correlate(None)
+        ))
+
+    blocks = {}
+    for key, person_id in db.session.execute(
+        active_keys.where(PersonMatchKey.key.in_(shared)).order_by(PersonMatchKey.key, PersonMatchKey.person_id)
+    ):
+        blocks.setdefault(key, []).append(person_id)
+
+    involved = {person_id for members in blocks.values() for person_id in members}
+    people = {row.id: row for row in db.session.query(
+        Person.id, Person.name, Person.email, Person.phone
+    ).filter(Person.id.in_(db.select(PersonMatchKey.person_id).where(PersonMatchKey.key.in_(shared))))
+        if row.id in involved}
+
+    targets = set(person_ids) if person_ids is not None else None
+    pairs = {}
+    for key, members in blocks.items():
+        if key.startswith('n:') and len(members) > MAX_BLOCK_SIZE:
+            continue
+        for i, first_id in enumerate(members):
+            for second_id in members[i + 1:]:
+                if (first_id, second_id) in pairs:
+                    continue
+                if targets is not None and first_id not in targets and second_id not in targets:
+                    continue
+                score, reasons = score_match(people[first_id], people[second_id])
+                if score >= MATCH_THRESHOLD:
+                    pairs[(first_id, second_id)] = {
+                        'a': people[first_id], 'b': people[second_id], 'score': score, 'reasons': reasons
+                    }
+
+    return sorted(pairs.values(), key=lambda pair: (-pair['score'], pair['a'].name, pair['b'].name))
@@ -0,0 +1,18 @@
+# Gunicorn settings for ./start.sh --prod
+# Each setting can be overridden from the environment.
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '127.0.0.1:7234')
+
+# Several processes use more than one core; threads within each keep
+# slow requests (imports, exports) from blocking the rest
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count(), 4)))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import the app (and initialize the database) once, then fork the workers
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+
+timeout = 60
+accesslog = '-'
@@ -0,0 +1,147 @@
+"""Conditional GET (ETag / Last-Modified) for read-heavy pages.
+
+The data_version row holds a random token and a timestamp that change on
+every commit that writes through the session (ORM flushes and bulk
+insert/update/delete statements alike). A page's ETag is derived from that
+token, the URL, today's date and the code version, so checking whether a
+browser's copy is current costs one single-row SELECT: no models are loaded
+and nothing is rendered before answering 304 Not Modified.
+
+Pages that only show archived years pass their own ``version`` instead of
+using the token, so unrelated writes (a task toggle, an import) don't
+invalidate them.
+"""
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, date
+from functools import wraps
+from threading import Lock
+from flask import current_app, request, session, make_response
+from sqlalchemy import event
+from werkzeug.http import is_resource_modified
+from models import db, DataVersion
+
+_BUMP_VERSION = db.text('UPDATE data_version SET token = :token, changed_at = :changed_at')
+
+# Rendered pages by ETag, for views declared with store=True
+_pages = OrderedDict()
+_pages_lock = Lock()
+_code_stamp = None
+# Session factories track_writes has hooked
+_tracked_sessions = set()
+
+
+def ensure_data_version():
+    """Create the data_version row if it is missing."""
+    with db.engine.begin() as connection:
+        if not connection.execute(db.select(DataVersion.id)).first():
+            connection.execute(db.insert(DataVersion).values(
+                id=1, token=uuid.uuid4().hex, changed_at=datetime.utcnow()
+            ))
+
+
+def track_writes(session_factory):
+    """Bump data_version in every session transaction that writes.
+
+    Every app shares the db.session factory, so later calls are no-ops.
+    """
+    if session_factory in _tracked_sessions:
+        return
+    _tracked_sessions.add(session_factory)
+
+    @event.listens_for(session_factory, 'after_flush')
+    def _flushed(session, flush_context):
+        session.info['data_changed'] = True
+
+    @event.listens_for(session_factory, 'do_orm_execute')
+    def _executed(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            orm_execute_state.session.info['data_changed'] = True
+
+    @event.listens_for(session_factory, 'before_commit')
+    def _committing(session):
+        session.flush()  # Commit would flush after this hook; pending changes must count
+        if session.info.pop('data_changed', False):
+            session.execute(_BUMP_VERSION, {'token': uuid.uuid4().hex, 'changed_at': datetime.utcnow()})
+
+    @event.listens_for(session_factory, 'after_soft_rollback')
+    def _rolled_back(session, previous_transaction):
+        session.info.pop('data_changed', None)
+
+
+def _code_version():
+    """Newest modification time of the app's code and templates."""
+    global _code_stamp
+    if _code_stamp is None:
+        root = current_app.root_path
+        paths = [os.path.join(root, name) for name in os.listdir(root) if name.endswith('.py')]
+        for folder, _, files in os.walk(os.path.join(root, current_app.template_folder)):
+            paths.extend(os.path.join(folder, name) for name in files)
+        _code_stamp = max(os.path.getmtime(path) for path in paths)
+    return _code_stamp
+
+
+def conditional(store=False, version=None):
+    """Decorate a GET view so unchanged pages are answered with 304.
+
+    With ``store``, the rendered HTML is also kept in memory by ETag (used
+    for archived years), so other browsers get it without a re-render.
+    ``version`` is called with the view's arguments and returns
+    ``(key, changed_at)`` for what the page shows, replacing the global
+    data_version token, or None to just run the view. Requests with
+    pending flash messages always render normally.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            code_version = _code_version()
+            if version is None:
+                token, changed_at = db.session.execute(
+                    db.select(DataVersion.token, DataVersion.changed_at)
+                ).one()
+                # Pages can also change at midnight (active year)
+                today = date.today()
+                key = f'{token}|{today}'
+                changed_at = max(changed_at, datetime.combine(today, datetime.min.time()))
+            else:
+                stamp = version(*args, **kwargs)
+                if stamp is None:
+                    return view(*args, **kwargs)
+                key, changed_at = stamp
+            # Pages also change with new code
+            etag = hashlib.sha1(f'{key}|{request.full_path}|{code_version}'.encode()).hexdigest()
+            last_modified = max(changed_at, datetime.utcfromtimestamp(int(code_version)))
+
+            page = _pages.get(etag) if store else None
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = current_app.response_class(status=304)
+            elif page is not None:
+                response = make_response(page)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if store:
+                    _store_page(etag, response.get_data())
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Always revalidate: the browser may reuse its copy only after a 304
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def _store_page(etag, body):
+    limit = current_app.config['ARCHIVE_PAGE_CACHE_SIZE']
+    with _pages_lock:
+        _pages[etag] = body
+        while len(_pages) > limit:
+            _pages.popitem(last=False)
@@ -0,0 +1,365 @@
+import csv
+import io
+import itertools
+import os
+import tempfile
+import threading
+import time
+import uuid
+from datetime import date, datetime
+from models import db, Person, EcardDelivery, ImportJob
+from utils import normalize_phone
+from duplicates import index_people, find_all_duplicates
+from archives import refresh_snapshot_deliveries
+
+
+class PeopleImporter:
+    """Set-based importer for Paperless Post contact exports.
+
+    Every duplicate key that can match an incoming row (name+email,
+    name+phone, or just name) is loaded into memory in a single query, so
+    each row is checked against a hash set instead of the database. New
+    people are written with one bulk INSERT per batch of rows.
+
+    Rows are also checked against the rows already accepted from the same
+    file, so a contact listed twice in an export is only imported once.
+    Near-misses (Jon/Jonathan, differently cased emails) are imported but
+    counted as possible duplicates for review on /people/duplicates.
+    """
+
+    def __init__(self):
+        start = time.perf_counter()
+        self.imported_count = 0
+        self.skipped_count = 0
+        self.possible_duplicate_count = 0
+        self.rows_processed = 0
+
+        self._names = set()
+        self._name_emails = set()
+        self._name_phones = set()
+
+        existing = db.session.query(Person.name, Person.email, Person.phone).filter(
+            Person.active == True
+        )
+        for name, email, phone in existing:
+            self._remember(name, email, phone)
+
+        self.elapsed = time.perf_counter() - start
+
+    def _remember(self, name, email, phone):
+        self._names.add(name)
+        if email:
+            self._name_emails.add((name, email))
+        if phone:
+            self._name_phones.add((name, phone))
+
+    def _is_duplicate(self, name, email, phone):
+        # Same precedence as the per-row lookups this replaces
+        if email:
+            return (name, email) in self._name_emails
+        elif phone:
+            return (name, phone) in self._name_phones
+        return name in self._names
+
+    def add_rows(self, rows):
+        """Import an iterable of CSV rows (dicts) with one bulk INSERT.
+
+        Does not commit; the caller owns the transaction.
+        """
+        start = time.perf_counter()
+        new_people = []
+
+        for row in rows:
+            self.rows_processed += 1
+
+            name = row.get('Full Name', '').strip()
+            contact_info = row.get('Email/Phone Number', '').strip()
+
+            if not name:
+                continue
+
+            # Detect if contact_info is email or phone
+            email = None
+            phone = None
+            if contact_info:
+                if '@' in contact_info:
+                    email = contact_info
+                else:
+                    phone = normalize_phone(contact_info)
+
+            if self._is_duplicate(name, email, phone):
+                self.skipped_count += 1
+                continue
+
+            self._remember(name, email, phone)
+
+            # New person with defaults
+            new_people.append({
+                'name': name,
+                'email': email,
+                'phone': phone,
+                'person_type': 'Other',
+                'card_preference': 'E-card',
+                'gets_gift': False,
+            })
+
+        if new_people:
+            new_ids = db.session.scalars(
+                db.insert(Person).returning(Person.id), new_people
+            ).all()
+            self.imported_count += len(new_ids)
+
+            # Index the new people and count those that look like someone else
+            index_people(new_ids)
+            new_id_set = set(new_ids)
+            flagged = set()
+            for pair in find_all_duplicates(new_ids):
+                flagged.update({pair['a'].id, pair['b'].id} & new_id_set)
+            self.possible_duplicate_count += len(flagged)
+
+        self.elapsed += time.perf_counter() - start
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.rows_processed / self.elapsed
+
+
+    def summary(self):
+        message = f'Imported {self.imported_count} people. Skipped {self.skipped_count} duplicates. '
+        if self.possible_duplicate_count:
+            message += (f'{self.possible_duplicate_count} imported people may duplicate someone else; '
+                        f'review them under Possible Duplicates. ')
+        return message + f'({self.rows_per_second:,.0f} rows/sec)'
+
+
+class EcardDeliveryImporter:
+    """Importer for Paperless Post recipient lists with delivery status.
+
+    A resolution index is built once per import: active people keyed by
+    normalized phone, email and name, plus the delivery rows
+    that already exist for the target year. Each CSV row is resolved
+    against the index in memory, and every chunk is written as one bulk
+    INSERT plus one bulk UPDATE.
+
+    Matching is unchanged: phone for sms rows, email for email rows, then
+    name, all compared exactly as the per-row queries did.
+    """
+
+    def __init__(self, delivery_year):
+        self.delivery_year = delivery_year
+        self.imported_count = 0
+        self.updated_count = 0
+        self.skipped_count = 0
+        self.rows_processed = 0
+        self.error_count = 0
+        self.errors = []  # First few unmatched rows, for display
+
+        # Lowest id wins when several people share a key, like .first() did
+        self._by_phone = {}
+        self._by_email = {}
+        self._by_name = {}
+        people = db.session.query(Person.id, Person.name, Person.email, Person.phone).filter(
+            Person.active == True
+        ).order_by(Person.id)
+        for person_id, name, email, phone in people:
+            if phone:
+                self._by_phone.setdefault(phone, person_id)
+            if email:
+                self._by_email.setdefault(email, person_id)
+            self._by_name.setdefault(name, person_id)
+
+        # (person_id, contact_used) -> {'id': ..., 'message': ...}
+        self._existing = {}
+        deliveries = db.session.query(
+            EcardDelivery.id, EcardDelivery.person_id, EcardDelivery.contact_used, EcardDelivery.message
+        ).filter(EcardDelivery.year == delivery_year)
+        for delivery_id, person_id, contact_used, message in deliveries:
+            self._existing[(person_id, contact_used)] = {'id': delivery_id, 'message': message}
+
+    def _resolve_person(self, name, contact_info, contact_type):
+        person_id = None
+        if contact_type == 'sms' and contact_info:
+            person_id = self._by_phone.get(contact_info)
+        elif contact_type == 'email':
+            person_id = self._by_email.get(contact_info)
+
+        if person_id is None:
+            # Try to find by name as fallback
+            person_id = self._by_name.get(name)
+        return person_id
+
+    def add_rows(self, rows):
+        """Import an iterable of CSV rows (dicts) as one upsert. Does not commit."""
+        today = date.today()
+        inserts = {}  # (person_id, contact_used) -> new row values
+        updates = {}  # delivery id -> changed values
+
+        for row in rows:
+            self.rows_processed += 1
+
+            name = row.get('Full Name', '').strip()
+            contact_info = row.get('Email/Phone Number', '').strip()
+            status = row.get('Status', '').strip()
+            message = row.get('Message', '').strip()
+            contact_type = row.get('Type', '').strip()  # 'email' or 'sms'
+
+            if not name or not contact_info:
+                continue
+
+            # Normalize phone if it's SMS
+            if contact_type == 'sms':
+                contact_info = normalize_phone(contact_info)
+
+            person_id = self._resolve_person(name, contact_info, contact_type)
+            if person_id is None:
+                self._record_error(f'Could not find person: {name} ({contact_info})')
+                self.skipped_count += 1
+                continue
+
+            key = (person_id, contact_info)
+            existing = self._existing.get(key)
+
+            if existing:
+                # Update existing record
+                existing['message'] = message if message else existing['message']
+                updates[existing['id']] = {
+                    'id': existing['id'],
+                    'status': status,
+                    'message': existing['message'],
+                    'imported_date': today,
+                }
+                self.updated_count += 1
+            elif key in inserts:
+                # Repeated earlier in this chunk; fold into the pending insert
+                pending = inserts[key]
+                pending['status'] = status
+                pending['message'] = message if message else pending['message']
+                self.updated_count += 1
+            else:
+                # Create new delivery record
+                inserts[key] = {
+                    'person_id': person_id,
+                    'year': self.delivery_year,
+                    'status': status,
+                    'contact_used': contact_info,
+                    'contact_type': contact_type,
+                    'message': message if message else None,
+                    'imported_date': today,
+                }
+                self.imported_count += 1
+
+        if inserts:
+            # Rows come back in any order (ordered RETURNING would mean one
+            # statement per row on SQLite), so match them up by their key
+            new_rows = db.session.execute(
+                db.insert(EcardDelivery).returning(
+                    EcardDelivery.id, EcardDelivery.person_id, EcardDelivery.contact_used
+                ),
+                list(inserts.values())
+            )
+            # Later chunks update these rows instead of inserting them again
+            for delivery_id, person_id, contact_used in new_rows:
+                key = (person_id, contact_used)
+                self._existing[key] = {'id': delivery_id, 'message': inserts[key]['message']}
+
+        if updates:
+            db.session.execute(db.update(EcardDelivery), list(updates.values()))
+
+        # Archived years keep their delivery counts in the snapshot
+        if inserts or updates:
+            refresh_snapshot_deliveries(self.delivery_year)
+
+    def _record_error(self, error):
+        self.error_count += 1
+        if len(self.errors) < 5:
+            self.errors.append(error)
+
+    def summary(self):
+        return (f'Imported {self.imported_count} new deliveries, updated {self.updated_count} '
+                f'for {self.delivery_year}. Skipped {self.skipped_count}.')
+
+
+def _make_importer(kind, options):
+    if kind == 'people':
+        return PeopleImporter()
+    elif kind == 'ecard_deliveries':
+        return EcardDeliveryImporter(options['year'])
+    raise ValueError(f'Unknown import kind: {kind}')
+
+
+def start_import_job(app, kind, upload, result_url, **options):
+    """Spool an uploaded CSV to disk and import it in the background.
+
+    The upload is copied to a temporary file in fixed-size blocks, so the
+    request never holds the whole file in memory. Returns the new job id;
+    progress is recorded on the ImportJob row and can be polled.
+    """
+    fd, path = tempfile.mkstemp(prefix='import-', suffix='.csv')
+    with os.fdopen(fd, 'wb') as spool:
+        upload.save(spool)
+    total_bytes = os.path.getsize(path)
+
+    job = ImportJob(
+        id=uuid.uuid4().hex,
+        kind=kind,
+        status='queued',
+        total_bytes=total_bytes,
+        result_url=result_url
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    args = (app, job.id, path, kind, options)
+    if app.config.get('IMPORT_RUN_IN_BACKGROUND', True):
+        threading.Thread(target=_run_import_job, args=args, daemon=True).start()
+    else:
+        _run_import_job(*args)
+
+    return job.id
+
+
+def _run_import_job(app, job_id, path, kind, options):
+    """Stream a spooled CSV through an importer, committing per chunk."""
+    chunk_size = app.config.get('IMPORT_CHUNK_SIZE', 1000)
+
+    with app.app_context():
+        job = db.session.get(ImportJob, job_id)
+        try:
+            importer = _make_importer(kind, options)
+            job.status = 'running'
+            db.session.commit()
+
+            with open(path, 'rb') as raw:
+                # Decode incrementally; only one read buffer is held at a time
+                stream = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+                csv_reader = csv.DictReader(stream)
+
+                while True:
+                    chunk = list(itertools.islice(csv_reader, chunk_size))
+                    if not chunk:
+                        break
+
+                    importer.add_rows(chunk)
+
+                    # Progress is committed together with the chunk it describes
+                    job.rows_processed = importer.rows_processed
+                    job.bytes_read = raw.tell()
+                    db.session.commit()
+
+            job.status = 'done'
+            job.bytes_read = job.total_bytes
+            job.message = importer.summary()
+            if getattr(importer, 'errors', None):
+                job.warnings = f'Errors: {"; ".join(importer.errors)}'
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(ImportJob, job_id)
+            job.status = 'failed'
+            job.message = f'Import failed after {job.rows_processed} rows: {e}'
+            app.logger.exception('Import job %s failed', job_id)
+        finally:
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            os.remove(path)
@@ -0,0 +1,168 @@
+"""Per-request SQL instrumentation, slow logs and Prometheus metrics.
+
+SQLAlchemy cursor events time every statement. During a request the
+statement count, total database time and the few slowest statements are
+kept on flask.g; when the response goes out they are added as a
+Server-Timing header, logged if the request or a statement was slow, and
+folded into per-endpoint histograms served at /metrics in the Prometheus
+text format. The per-statement work is two clock reads and a couple of
+comparisons, so this stays on in production.
+
+Metrics are per process: with several gunicorn workers each one reports
+its own counts.
+"""
+import json
+import re
+import time
+from bisect import bisect_left
+from threading import Lock
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+# Request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Slowest statements kept per request for the slow-request log
+SLOWEST_KEPT = 3
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_metrics = {}  # endpoint -> {'buckets': [...], 'count', 'sum', 'statements', 'db_seconds'}
+_metrics_lock = Lock()
+
+
+def normalize_sql(statement):
+    """Collapse whitespace, literals and IN lists so similar queries match."""
+    statement = _LITERALS.sub('?', _WHITESPACE.sub(' ', statement).strip())
+    return _IN_LISTS.sub('(...)', statement)
+
+
+class RequestStats:
+    """SQL work done while serving one request."""
+    __slots__ = ('start', 'statements', 'db_seconds', 'slowest')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = 0
+        self.db_seconds = 0.0
+        self.slowest = []  # [(seconds, raw statement)], at most SLOWEST_KEPT
+
+    def record(self, statement, elapsed):
+        self.statements += 1
+        self.db_seconds += elapsed
+        if len(self.slowest) < SLOWEST_KEPT:
+            self.slowest.append((elapsed, statement))
+        elif elapsed > self.slowest[-1][0]:
+            self.slowest[-1] = (elapsed, statement)
+        else:
+            return
+        self.slowest.sort(reverse=True)
+
+
+def init_instrumentation(app, engine):
+    """Time statements on the engine and collect them per request."""
+    slow_query = app.config['SLOW_QUERY_MS'] / 1000
+    slow_request = app.config['SLOW_REQUEST_MS'] / 1000
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_start'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start']
+        stats = g.get('request_stats') if has_app_context() else None
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if elapsed >= slow_query:
+            app.logger.warning('Slow query: %s', json.dumps({
+                'ms': round(elapsed * 1000, 1),
+                'sql': normalize_sql(statement),
+                'endpoint': request.endpoint if stats is not None else None,
+            }))
+
+    @app.before_request
+    def _start_request_stats():
+        g.request_stats = RequestStats()
+
+    @app.after_request
+    def _finish_request_stats(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        total = time.perf_counter() - stats.start
+        endpoint = request.endpoint or 'unmatched'
+
+        response.headers['Server-Timing'] = (
+            f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} statements", '
+            f'total;dur={total * 1000:.1f}'
+        )
+        _observe(endpoint, total, stats)
+
+        if total >= slow_request:
+            app.logger.warning('Slow request: %s', json.dumps({
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'ms': round(total * 1000, 1),
+                'db_ms': round(stats.db_seconds * 1000, 1),
+                'statements': stats.statements,
+                'slowest': [{'ms': round(elapsed * 1000, 1), 'sql': normalize_sql(statement)}
+                            for elapsed, statement in stats.slowest],
+            }))
+        return response
+
+
+def _observe(endpoint, seconds, stats):
+    with _metrics_lock:
+        metric = _metrics.get(endpoint)
+        if metric is None:
+            metric = _metrics[endpoint] = {
+                'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0, 'statements': 0, 'db_seconds': 0.0
+            }
+        # Buckets are stored non-cumulatively and summed when rendered
+        index = bisect_left(BUCKETS, seconds)
+        if index < len(BUCKETS):
+            metric['buckets'][index] += 1
+        metric['count'] += 1
+        metric['sum'] += seconds
+        metric['statements'] += stats.statements
+        metric['db_seconds'] += stats.db_seconds
+
+
+def render_metrics():
+    """Return every endpoint's metrics as Prometheus exposition text."""
+    with _metrics_lock:
+        snapshot = {endpoint: dict(metric, buckets=list(metric['buckets']))
+                    for endpoint, metric in sorted(_metrics.items())}
+
+    lines = [
+        '# HELP be_thoughtful_request_duration_seconds Time to handle a request.',
+        '# TYPE be_thoughtful_request_duration_seconds histogram',
+    ]
+    for endpoint, metric in snapshot.items():
+        cumulative = 0
+        for bound, count in zip(BUCKETS, metric['buckets']):
+            cumulative += count
+            lines.append(f'be_thoughtful_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} '
+                         f'{cumulative}')
+        lines.append(f'be_thoughtful_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} '
+                     f'{metric["count"]}')
+        lines.append(f'be_thoughtful_request_duration_seconds_sum{{endpoint="{endpoint}"}} {metric["sum"]:.6f}')
+        lines.append(f'be_thoughtful_request_duration_seconds_count{{endpoint="{endpoint}"}} {metric["count"]}')
+
+    for name, key, help_text in (
+        ('be_thoughtful_db_statements_total', 'statements', 'SQL statements executed while handling requests.'),
+        ('be_thoughtful_db_duration_seconds_total', 'db_seconds', 'Time spent in SQL while handling requests.'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for endpoint, metric in snapshot.items():
+            value = metric[key]
+            lines.append(f'{name}{{endpoint="{endpoint}"}} {value:.6f}' if isinstance(value, float)
+                         else f'{name}{{endpoint="{endpoint}"}} {value}')
+
+    return '\n'.join(lines) + '\n'
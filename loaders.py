@@ -0,0 +1,66 @@
+"""Batched loaders for per-person data shown on list pages.
+
+Each loader fetches data for a whole set of people in a single query and
+returns it grouped by person, so views can assemble their rows in memory
+instead of querying once per person. ``person_ids`` may be a list of ids
+or a select() of ids; passing a select keeps the statement count constant
+no matter how many people it matches.
+"""
+from models import db, Person, GiftIdea, Task
+
+
+def load_unused_gift_ideas(person_ids):
+    """Return {person_id: [GiftIdea, ...]} of unused ideas, newest first."""
+    ideas = GiftIdea.query.filter(
+        GiftIdea.person_id.in_(person_ids),
+        GiftIdea.used_year == None
+    ).order_by(GiftIdea.person_id, GiftIdea.added_date.desc(), GiftIdea.id).all()
+
+    ideas_by_person = {}
+    for idea in ideas:
+        ideas_by_person.setdefault(idea.person_id, []).append(idea)
+    return ideas_by_person
+
+
+def load_tasks(person_ids, year, task_types):
+    """Return {(person_id, task_type): Task} for the given year.
+
+    If a person somehow has several tasks of one type, the oldest wins,
+    matching what a per-person .first() lookup returned.
+    """
+    tasks = Task.query.filter(
+        Task.person_id.in_(person_ids),
+        Task.year == year,
+        Task.task_type.in_(task_types)
+    ).order_by(Task.id).all()
+
+    tasks_by_key = {}
+    for task in tasks:
+        tasks_by_key.setdefault((task.person_id, task.task_type), task)
+    return tasks_by_key
+
+
+def load_people_with_task_status(people_query, year, task_type):
+    """Return [{'person', 'completed', 'task_id'}] for every person in a query.
+
+    ``people_query`` is a Person query carrying the view's own filters and
+    ordering; one task type for one year is outer-joined onto it, so
+    people without a task come back with completed=False and task_id=None.
+    The whole list costs a single statement.
+    """
+    rows = people_query.outerjoin(Task, db.and_(
+        Task.person_id == Person.id,
+        Task.year == year,
+        Task.task_type == task_type
+    )).add_columns(Task.id, Task.completed).order_by(Person.id, Task.id)
+
+    status_by_person = {}
+    for person, task_id, completed in rows:
+        # Oldest task wins if a person has duplicates
+        if person.id not in status_by_person:
+            status_by_person[person.id] = {
+                'person': person,
+                'completed': bool(completed),
+                'task_id': task_id
+            }
+    return list(status_by_person.values())
@@ -0,0 +1,144 @@
+"""Lightweight schema migrations for existing databases.
+
+db.create_all() creates missing tables, but never touches tables that
+already exist. Anything added to an existing table afterwards (indexes,
+constraints) is applied here, idempotently, on every startup.
+"""
+import json
+from sqlalchemy.schema import CreateIndex
+from models import db, Person, Task, GiftIdea, EcardDelivery, MilestoneSubtask
+from search import ensure_search_index
+from duplicates import ensure_match_keys
+from rollups import ensure_year_rollups
+from http_cache import ensure_data_version
+from archives import backfill_archive_snapshots
+
+
+def apply_schema_migrations():
+    """Bring an existing database up to date with the models."""
+    dedupe_tasks()
+    create_missing_indexes()
+    migrate_milestone_subtasks()
+    ensure_search_index()
+    ensure_match_keys()
+    ensure_year_rollups()
+    ensure_data_version()
+    backfill_archive_snapshots()
+
+
+def create_missing_indexes():
+    """Create any index declared on a model but missing from the database."""
+    # IF NOT EXISTS rather than checkfirst, which can't reflect expression indexes
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+
+def dedupe_tasks():
+    """Merge duplicate tasks so the unique task index can be created.
+
+    Older databases could end up with several tasks for the same person,
+    year and type. The oldest one is kept and takes the merged state: done
+    if any copy was done, the earliest completed date and the first actual
+    gift recorded; the others are deleted. The rollup triggers adjust the
+    year counters as rows change.
+    """
+    with db.engine.begin() as connection:
+        if connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'uq_tasks_person_year_type'"
+        ).first():
+            return
+
+        same_task = ('d.person_id = tasks.person_id AND d.year = tasks.year '
+                     'AND d.task_type = tasks.task_type')
+        connection.exec_driver_sql(
+            f'UPDATE tasks SET '
+            f'completed = (SELECT MAX(COALESCE(d.completed, 0)) FROM tasks d WHERE {same_task}), '
+            f'completed_date = (SELECT MIN(d.completed_date) FROM tasks d WHERE {same_task} AND d.completed), '
+            f"actual_gift = (SELECT d.actual_gift FROM tasks d WHERE {same_task} AND d.actual_gift != '' "
+            f'ORDER BY d.id LIMIT 1) '
+            f'WHERE id IN (SELECT MIN(id) FROM tasks WHERE person_id IS NOT NULL '
+            f'GROUP BY person_id, year, task_type HAVING COUNT(*) > 1)'
+        )
+        connection.exec_driver_sql(
+            'DELETE FROM tasks WHERE person_id IS NOT NULL AND id NOT IN '
+            '(SELECT MIN(id) FROM tasks WHERE person_id IS NOT NULL GROUP BY person_id, year, task_type)'
+        )
+        # Superseded by the unique index on the same columns
+        connection.exec_driver_sql('DROP INDEX IF EXISTS ix_tasks_person_year_type')
+
+
+def migrate_milestone_subtasks():
+    """Move subtasks out of the old JSON columns on milestones.
+
+    Older databases stored each milestone's checklist as a JSON list of
+    descriptions (subtasks) plus a JSON list of completed indices
+    (completed_subtasks). Milestones that have no milestone_subtasks rows
+    yet are copied over; the old columns are left in place but unused.
+    """
+    with db.engine.begin() as connection:
+        columns = {row[1] for row in connection.exec_driver_sql('PRAGMA table_info(milestones)')}
+        if 'subtasks' not in columns:
+            return
+
+        rows = []
+        for milestone_id, subtasks, completed in connection.exec_driver_sql(
+            'SELECT id, subtasks, completed_subtasks FROM milestones WHERE id NOT IN '
+            '(SELECT milestone_id FROM milestone_subtasks)'
+        ):
+            completed = set(json.loads(completed or '[]'))
+            rows.extend({
+                'milestone_id': milestone_id,
+                'position': position,
+                'description': description,
+                'completed': position in completed
+            } for position, description in enumerate(json.loads(subtasks or '[]')))
+
+        if rows:
+            connection.execute(db.insert(MilestoneSubtask), rows)
+
+
+def _hot_queries():
+    """Representative shapes of the queries on the app's hot paths."""
+    from pagination import PEOPLE_SORTS
+    return {
+        'people by name': Person.query.filter_by(active=True, name='?'),
+        'people by email': Person.query.filter_by(active=True, email='?'),
+        'people by phone': Person.query.filter_by(active=True, phone='?'),
+        'people page by type': Person.query.filter(
+            Person.active == True,
+            PEOPLE_SORTS['type'][0] >= '?',
+            db.tuple_(*PEOPLE_SORTS['type']) > db.tuple_('?', '?', 0)
+        ).order_by(*PEOPLE_SORTS['type']).limit(50),
+        'people page by budget': Person.query.filter(
+            Person.active == True,
+            PEOPLE_SORTS['budget'][0] >= 0,
+            db.tuple_(*PEOPLE_SORTS['budget']) > db.tuple_(0, '?', 0)
+        ).order_by(*PEOPLE_SORTS['budget']).limit(50),
+        'task for person': Task.query.filter_by(person_id=1, year=2025, task_type='card_written'),
+        'completed tasks for year': Task.query.filter_by(year=2025, task_type='gift_given', completed=True),
+        'unused gift ideas': GiftIdea.query.filter_by(person_id=1, used_year=None).order_by(
+            GiftIdea.added_date.desc()
+        ),
+        'milestone subtask': MilestoneSubtask.query.filter_by(milestone_id=1, position=0),
+        'deliveries by status': EcardDelivery.query.filter_by(year=2025, status='Bounced'),
+    }
+
+
+def check_query_plans():
+    """Run EXPLAIN QUERY PLAN on each hot query shape.
+
+    Returns a list of (label, plan_details, uses_index). Every hot query is
+    a point lookup or range, so it must SEARCH an index: a plan with any
+    SCAN step, a full scan of an index included, has uses_index=False.
+    """
+    connection = db.session.connection()
+    results = []
+    for label, query in _hot_queries().items():
+        sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+        uses_index = (any(step.startswith('SEARCH') for step in plan)
+                      and not any(step.startswith('SCAN') for step in plan))
+        results.append((label, plan, uses_index))
+    return results
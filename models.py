@@ -26,10 +26,25 @@ class Person(db.Model):
     tasks = db.relationship('Task', backref='person', cascade='all, delete-orphan', lazy=True)
     ecard_deliveries = db.relationship('EcardDelivery', backref='person', cascade='all, delete-orphan', lazy=True)
 
+    __table_args__ = (
+        db.Index('ix_people_active_name', 'active', 'name'),
+        db.Index('ix_people_active_email', 'active', 'email'),
+        db.Index('ix_people_active_phone', 'active', 'phone'),
+    )
+
     def __repr__(self):
         return f'<Person {self.name}>'
 
 
+# Sort keys for the paginated people list (see pagination.py), with
+# expression indexes so sorting by them is a seek too. Literals are inlined
+# so that queries compile to exactly the indexed expressions.
+PERSON_TYPE_SORT_KEY = db.func.coalesce(Person.person_type, db.literal_column("''"))
+PERSON_BUDGET_SORT_KEY = -db.func.coalesce(Person.budget, db.literal_column('0'))
+db.Index('ix_people_active_type_name', Person.active, PERSON_TYPE_SORT_KEY, Person.name)
+db.Index('ix_people_active_budget_name', Person.active, PERSON_BUDGET_SORT_KEY, Person.name)
+
+
 class GiftIdea(db.Model):
     __tablename__ = 'gift_ideas'
 
@@ -40,6 +55,8 @@ class GiftIdea(db.Model):
     used_year = db.Column(db.Integer)
     notes = db.Column(db.Text)
 
+    __table_args__ = (db.Index('ix_gift_ideas_person_used_added', 'person_id', 'used_year', 'added_date'),)
+
     def __repr__(self):
         return f'<GiftIdea {self.idea[:30]}>'
 
@@ -56,6 +73,12 @@ class Task(db.Model):
     year = db.Column(db.Integer, nullable=False)
     actual_gift = db.Column(db.Text)
 
+    __table_args__ = (
+        # One task of each type per person and year; also the ON CONFLICT target for upserts
+        db.Index('uq_tasks_person_year_type', 'person_id', 'year', 'task_type', unique=True),
+        db.Index('ix_tasks_year_type_completed', 'year', 'task_type', 'completed'),
+    )
+
     def __repr__(self):
         return f'<Task {self.task_type} - Year {self.year}>'
 
@@ -70,8 +93,10 @@ class Milestone(db.Model):
     completed_date = db.Column(db.Date)
     year = db.Column(db.Integer, nullable=False)
     ai_chat_link = db.Column(db.String(500))
-    subtasks = db.Column(db.JSON, default=list)  # List of subtask descriptions for this year
-    completed_subtasks = db.Column(db.JSON, default=list)  # List of completed subtask indices
+
+    # Checklist for this year, in display order
+    subtasks = db.relationship('MilestoneSubtask', backref='milestone', cascade='all, delete-orphan',
+                               order_by='MilestoneSubtask.position', lazy=True)
 
     __table_args__ = (db.UniqueConstraint('phase', 'year', name='unique_phase_year'),)
 
@@ -79,6 +104,21 @@ class Milestone(db.Model):
         return f'<Milestone {self.phase} {self.year}>'
 
 
+class MilestoneSubtask(db.Model):
+    __tablename__ = 'milestone_subtasks'
+
+    id = db.Column(db.Integer, primary_key=True)
+    milestone_id = db.Column(db.Integer, db.ForeignKey('milestones.id'), nullable=False)
+    position = db.Column(db.Integer, nullable=False)  # Index within the milestone's checklist
+    description = db.Column(db.Text, nullable=False)
+    completed = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (db.UniqueConstraint('milestone_id', 'position', name='unique_milestone_subtask_position'),)
+
+    def __repr__(self):
+        return f'<MilestoneSubtask {self.milestone_id} #{self.position}>'
+
+
 class AnnualSummary(db.Model):
     __tablename__ = 'annual_summary'
 
@@ -96,6 +136,46 @@ class AnnualSummary(db.Model):
         return f'<AnnualSummary {self.year}>'
 
 
+class YearRollup(db.Model):
+    """Per-year counters, kept current by SQL triggers (see rollups.py)."""
+    __tablename__ = 'year_rollups'
+
+    year = db.Column(db.Integer, primary_key=True)
+    gifts_purchased = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Completed tasks
+    gifts_given = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    cards_written = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    deliveries = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # E-card deliveries
+    bounces = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    messages = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<YearRollup {self.year}>'
+
+
+class ArchiveSnapshot(db.Model):
+    """Everything an archived year's pages show, written at rollover (see archives.py)."""
+    __tablename__ = 'archive_snapshots'
+
+    year = db.Column(db.Integer, primary_key=True)
+    data = db.Column(db.JSON, nullable=False)  # summary, milestones, gift_recipients, deliveries
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Last written; keys the page ETags
+
+    def __repr__(self):
+        return f'<ArchiveSnapshot {self.year}>'
+
+
+class DataVersion(db.Model):
+    """Single row that changes on every write, for HTTP caching (see http_cache.py)."""
+    __tablename__ = 'data_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    token = db.Column(db.String(32), nullable=False)  # Random, replaced on each committed write
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<DataVersion {self.token}>'
+
+
 class EcardDelivery(db.Model):
     __tablename__ = 'ecard_deliveries'
 
@@ -108,7 +188,69 @@ class EcardDelivery(db.Model):
     message = db.Column(db.Text)  # Message from recipient
     imported_date = db.Column(db.Date, default=date.today)
 
-    __table_args__ = (db.UniqueConstraint('person_id', 'year', 'contact_used', name='unique_person_year_contact'),)
+    __table_args__ = (
+        db.UniqueConstraint('person_id', 'year', 'contact_used', name='unique_person_year_contact'),
+        db.Index('ix_ecard_deliveries_year_status', 'year', 'status'),
+    )
 
     def __repr__(self):
         return f'<EcardDelivery {self.person.name} {self.year} - {self.status}>'
+
+
+class ImportJob(db.Model):
+    __tablename__ = 'import_jobs'
+
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    kind = db.Column(db.String(50), nullable=False)  # 'people' or 'ecard_deliveries'
+    status = db.Column(db.String(20), default='queued')  # queued, running, done, failed
+    rows_processed = db.Column(db.Integer, default=0)
+    bytes_read = db.Column(db.Integer, default=0)
+    total_bytes = db.Column(db.Integer, default=0)
+    message = db.Column(db.Text)  # Result summary shown when the job finishes
+    warnings = db.Column(db.Text)  # e.g. rows that could not be matched
+    result_url = db.Column(db.String(500))  # Where to send the user afterwards
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'rows_processed': self.rows_processed,
+            'bytes_read': self.bytes_read,
+            'total_bytes': self.total_bytes,
+            'percent': round(self.bytes_read / self.total_bytes * 100, 1) if self.total_bytes else 0,
+            'message': self.message,
+            'warnings': self.warnings,
+            'result_url': self.result_url,
+        }
+
+    def __repr__(self):
+        return f'<ImportJob {self.kind} {self.status}>'
+
+
+class RolloverEvent(db.Model):
+    __tablename__ = 'rollover_events'
+
+    id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)  # Year that was archived
+    summary = db.Column(db.JSON)  # Stats returned by perform_rollover, shown in the modal
+    acknowledged = db.Column(db.Boolean, default=False)  # Set once the dashboard has shown it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RolloverEvent {self.year}>'
+
+
+class PersonMatchKey(db.Model):
+    """Blocking key for fuzzy duplicate detection (see duplicates.py)."""
+    __tablename__ = 'person_match_keys'
+
+    person_id = db.Column(db.Integer, db.ForeignKey('people.id', ondelete='CASCADE'), primary_key=True)
+    key = db.Column(db.String(250), primary_key=True)  # e.g. 'n:j-s530', 'e:jon@example.com', 'p:5551234567'
+
+    __table_args__ = (db.Index('ix_person_match_keys_key', 'key', 'person_id'),)
+
+    def __repr__(self):
+        return f'<PersonMatchKey {self.person_id} {self.key}>'
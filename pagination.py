@@ -0,0 +1,60 @@
+"""Keyset (seek) pagination for the people list.
+
+Instead of OFFSET, each page carries an opaque cursor holding the sort key
+of its last row, and the next page starts strictly after it. The database
+seeks straight to that key, so every page costs the same no matter how far
+into the list it is or how many people there are.
+"""
+import base64
+import json
+from models import db, Person, PERSON_TYPE_SORT_KEY, PERSON_BUDGET_SORT_KEY
+
+# Sort keys for each ?sort= option. Person.id comes last so every key is
+# unique; nullable columns are coalesced so row comparisons never see NULL.
+PEOPLE_SORTS = {
+    'name': (Person.name, Person.id),
+    'type': (PERSON_TYPE_SORT_KEY, Person.name, Person.id),
+    'budget': (PERSON_BUDGET_SORT_KEY, Person.name, Person.id),  # Highest first
+}
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(list(values)).encode()).decode()
+
+
+def decode_cursor(cursor, size):
+    """Return the key values in a cursor, or raise ValueError if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    if not all(isinstance(value, (str, int, float)) for value in values):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def paginate_people(query, sort='name', after=None, per_page=50):
+    """Return (people, next_cursor) for one page of a Person query.
+
+    ``after`` is the cursor from the previous page; next_cursor is None on
+    the last page. Raises ValueError for an unknown sort or a bad cursor.
+    """
+    if sort not in PEOPLE_SORTS:
+        raise ValueError(f'Unknown sort: {sort}')
+    keys = PEOPLE_SORTS[sort]
+
+    if after:
+        values = decode_cursor(after, len(keys))
+        # The redundant leading-key bound lets SQLite seek on expression indexes
+        query = query.filter(keys[0] >= values[0], db.tuple_(*keys) > db.tuple_(*values))
+
+    # Fetch one extra row to learn whether there is another page
+    rows = query.add_columns(*keys).order_by(*keys).limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    people = [row[0] for row in rows]
+    next_cursor = encode_cursor(rows[-1][1:]) if has_more else None
+    return people, next_cursor
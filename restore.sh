@@ -1,7 +1,7 @@
 #!/bin/bash
 # Restore script for Be Thoughtful database
 
-DB_FILE="instance/database.db"
+cd "$(dirname "$0")"
 BACKUPS_DIR="backups"
 
 # Check if backups directory exists
@@ -15,7 +15,7 @@ fi
 echo "Available backups:"
 echo ""
 
-BACKUPS=($(ls -1t "$BACKUPS_DIR"/*.db 2>/dev/null))
+mapfile -t BACKUPS < <(python3 backup.py list --paths)
 
 if [ ${#BACKUPS[@]} -eq 0 ]; then
     echo "No backups found!"
@@ -23,16 +23,7 @@ if [ ${#BACKUPS[@]} -eq 0 ]; then
 fi
 
 # Display backups with numbers
-for i in "${!BACKUPS[@]}"; do
-    BACKUP_FILE="${BACKUPS[$i]}"
-    BASENAME=$(basename "$BACKUP_FILE")
-    SIZE=$(du -h "$BACKUP_FILE" | cut -f1)
-    TIMESTAMP=$(stat -f "%Sm" -t "%Y-%m-%d %H:%M:%S" "$BACKUP_FILE")
-    echo "  [$i] $BASENAME"
-    echo "      Created: $TIMESTAMP"
-    echo "      Size: $SIZE"
-    echo ""
-done
+python3 backup.py list
 
 # Ask user to select a backup
 echo -n "Enter backup number to restore (or 'q' to quit): "
@@ -65,24 +56,5 @@ if [ "$CONFIRM" != "yes" ]; then
     exit 0
 fi
 
-# Create safety backup of current database before restoring
-if [ -f "$DB_FILE" ]; then
-    SAFETY_BACKUP="backups/database_before_restore_$(date +"%Y%m%d_%H%M%S").db"
-    cp "$DB_FILE" "$SAFETY_BACKUP"
-    echo "✓ Safety backup created: $SAFETY_BACKUP"
-fi
-
-# Restore the backup
-cp "$SELECTED_BACKUP" "$DB_FILE"
-
-if [ $? -eq 0 ]; then
-    echo "✓ Database restored successfully!"
-    echo ""
-    echo "Restart the Flask server to use the restored database."
-else
-    echo "✗ Restore failed!"
-    if [ -f "$SAFETY_BACKUP" ]; then
-        echo "Your original database is backed up at: $SAFETY_BACKUP"
-    fi
-    exit 1
-fi
+# Verify the backup, save the current database, then swap it in
+python3 backup.py restore "$SELECTED_BACKUP"
@@ -0,0 +1,112 @@
+"""Per-year rollup counters for the dashboard and archive.
+
+year_rollups holds one row per year with the number of completed
+gift_purchased, gift_given and card_written tasks, and the number of e-card
+deliveries, bounces and messages received. SQL triggers on tasks and
+ecard_deliveries adjust the counters in the same transaction as the write,
+so task toggles, bulk imports and raw SQL all keep them exact, and reading
+a year's stats is a primary key lookup instead of COUNT queries.
+"""
+from models import db, YearRollup
+
+ROLLUP_COLUMNS = ('gifts_purchased', 'gifts_given', 'cards_written', 'deliveries', 'bounces', 'messages')
+
+# Counter -> value (0 or 1) a task / delivery row contributes; {row} is new or old
+_TASK_TERMS = {
+    'gifts_purchased': "{row}.task_type = 'gift_purchased'",
+    'gifts_given': "{row}.task_type = 'gift_given'",
+    'cards_written': "{row}.task_type = 'card_written'",
+}
+_DELIVERY_TERMS = {
+    'deliveries': "1",
+    'bounces': "coalesce({row}.status, '') = 'Bounced'",
+    'messages': "coalesce({row}.message, '') != ''",
+}
+
+
+def _adjust(terms, row, sign, condition='1'):
+    """SQL adding (sign '+') or removing (sign '-') one row's contribution."""
+    # NOT EXISTS rather than INSERT OR IGNORE, which an outer upsert's ON CONFLICT would override
+    return (
+        f"INSERT INTO year_rollups (year) SELECT {row}.year WHERE {condition} "
+        f"AND NOT EXISTS (SELECT 1 FROM year_rollups WHERE year = {row}.year); "
+        "UPDATE year_rollups SET "
+        + ', '.join(f"{column} = {column} {sign} ({term.format(row=row)})" for column, term in terms.items())
+        + f" WHERE year = {row}.year AND {condition}; "
+    )
+
+
+ROLLUP_DDL = [
+    "CREATE TRIGGER IF NOT EXISTS rollup_tasks_insert AFTER INSERT ON tasks BEGIN "
+    + _adjust(_TASK_TERMS, 'new', '+', 'new.completed') + "END",
+    "CREATE TRIGGER IF NOT EXISTS rollup_tasks_update AFTER UPDATE OF completed, task_type, year ON tasks BEGIN "
+    + _adjust(_TASK_TERMS, 'old', '-', 'old.completed')
+    + _adjust(_TASK_TERMS, 'new', '+', 'new.completed') + "END",
+    "CREATE TRIGGER IF NOT EXISTS rollup_tasks_delete AFTER DELETE ON tasks BEGIN "
+    + _adjust(_TASK_TERMS, 'old', '-', 'old.completed') + "END",
+    "CREATE TRIGGER IF NOT EXISTS rollup_deliveries_insert AFTER INSERT ON ecard_deliveries BEGIN "
+    + _adjust(_DELIVERY_TERMS, 'new', '+') + "END",
+    "CREATE TRIGGER IF NOT EXISTS rollup_deliveries_update "
+    "AFTER UPDATE OF year, status, message ON ecard_deliveries BEGIN "
+    + _adjust(_DELIVERY_TERMS, 'old', '-')
+    + _adjust(_DELIVERY_TERMS, 'new', '+') + "END",
+    "CREATE TRIGGER IF NOT EXISTS rollup_deliveries_delete AFTER DELETE ON ecard_deliveries BEGIN "
+    + _adjust(_DELIVERY_TERMS, 'old', '-') + "END",
+]
+
+# Every counter computed from scratch, one row per year
+_ACTUAL_SQL = (
+    "SELECT year, " + ', '.join(f"sum({column}) AS {column}" for column in ROLLUP_COLUMNS) + " FROM ("
+    "SELECT year, " + ', '.join(f"({term.format(row='tasks')}) AS {column}" for column, term in _TASK_TERMS.items())
+    + ", 0 AS deliveries, 0 AS bounces, 0 AS messages FROM tasks WHERE completed "
+    "UNION ALL "
+    "SELECT year, 0, 0, 0, " + ', '.join(term.format(row='ecard_deliveries') for term in _DELIVERY_TERMS.values())
+    + " FROM ecard_deliveries"
+    ") GROUP BY year"
+)
+
+
+def ensure_year_rollups():
+    """Create the rollup triggers, filling the counters if they are new."""
+    with db.engine.begin() as connection:
+        exists = connection.exec_driver_sql(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'rollup_tasks_insert'"
+        ).scalar()
+        for statement in ROLLUP_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            _fill_year_rollups(connection)
+
+
+def rebuild_year_rollups():
+    """Recompute every year's counters from tasks and ecard_deliveries."""
+    with db.engine.begin() as connection:
+        _fill_year_rollups(connection)
+
+
+def _fill_year_rollups(connection):
+    connection.exec_driver_sql('DELETE FROM year_rollups')
+    connection.exec_driver_sql(f"INSERT INTO year_rollups (year, {', '.join(ROLLUP_COLUMNS)}) {_ACTUAL_SQL}")
+
+
+def check_year_rollups():
+    """Compare the stored counters with a full recount.
+
+    Returns a list of (year, column, stored, actual) for every mismatch.
+    """
+    actual = {row.year: row for row in db.session.execute(db.text(_ACTUAL_SQL))}
+    stored = {row.year: row for row in db.session.execute(db.select(YearRollup.__table__))}
+
+    mismatches = []
+    for year in sorted(set(actual) | set(stored)):
+        for column in ROLLUP_COLUMNS:
+            stored_value = getattr(stored[year], column) if year in stored else 0
+            actual_value = getattr(actual[year], column) if year in actual else 0
+            if stored_value != actual_value:
+                mismatches.append((year, column, stored_value, actual_value))
+    return mismatches
+
+
+def get_year_rollup(year):
+    """Return the counters for a year (all zero if nothing has happened yet)."""
+    return db.session.get(YearRollup, year) or YearRollup(year=year, **dict.fromkeys(ROLLUP_COLUMNS, 0))
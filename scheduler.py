@@ -0,0 +1,119 @@
+"""Background year rollover.
+
+check_and_perform_rollover() used to run inside dashboard and
+/api/rollover-check requests. It now runs from a scheduler thread (or the
+`flask rollover` command) under an exclusive lock, so concurrent workers
+can never archive the same year twice. A completed rollover is stored as a
+RolloverEvent that the dashboard only has to read.
+"""
+import os
+import threading
+import time
+from models import db, RolloverEvent
+from utils import check_and_perform_rollover
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to an in-process lock only
+    fcntl = None
+
+_process_lock = threading.Lock()
+_scheduler_start_lock = threading.Lock()
+_scheduler_started = False
+
+
+class _RolloverLock:
+    """Non-blocking exclusive lock shared by every worker process."""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        if not _process_lock.acquire(blocking=False):
+            return False
+        if fcntl is None:
+            return True
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.file = open(self.path, 'w')
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.file.close()
+            self.file = None
+            _process_lock.release()
+            return False
+        return True
+
+    def release(self):
+        if self.file:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+            self.file.close()
+            self.file = None
+        _process_lock.release()
+
+
+def run_rollover_job(app):
+    """Run the rollover check once, if no other worker is already running it.
+
+    Returns the rollover summary dict if a year was archived, None otherwise.
+    """
+    lock = _RolloverLock(os.path.join(app.instance_path, 'rollover.lock'))
+    if not lock.acquire():
+        app.logger.info('Rollover check already running elsewhere; skipping')
+        return None
+
+    try:
+        with app.app_context():
+            summary = check_and_perform_rollover()
+            if summary:
+                db.session.add(RolloverEvent(year=summary['year'], summary=summary))
+                db.session.commit()
+                app.logger.info('Archived %s during scheduled rollover', summary['year'])
+            return summary
+    finally:
+        lock.release()
+
+
+def start_rollover_scheduler(app):
+    """Start the rollover thread for this process (no-op if already running).
+
+    Checks immediately, then every ROLLOVER_CHECK_INTERVAL seconds.
+    """
+    global _scheduler_started
+    if _scheduler_started:
+        return
+    with _scheduler_start_lock:
+        if _scheduler_started or not app.config.get('ROLLOVER_SCHEDULER', True):
+            return
+        _scheduler_started = True
+
+    interval = app.config.get('ROLLOVER_CHECK_INTERVAL', 3600)
+
+    def loop():
+        while True:
+            try:
+                run_rollover_job(app)
+            except Exception:
+                app.logger.exception('Scheduled rollover failed')
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name='rollover-scheduler', daemon=True).start()
+
+
+def pop_rollover_notice():
+    """Return the summary of an unseen scheduled rollover and mark it seen."""
+    event = RolloverEvent.query.filter_by(acknowledged=False).order_by(RolloverEvent.id).first()
+    if not event:
+        return None
+
+    event.acknowledged = True
+    db.session.commit()
+    return event.summary
+
+
+def pending_rollover_notice():
+    """Return the summary of an unseen scheduled rollover without consuming it."""
+    event = RolloverEvent.query.filter_by(acknowledged=False).order_by(RolloverEvent.id).first()
+    return event.summary if event else None
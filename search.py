@@ -0,0 +1,164 @@
+"""Full-text search over people and gift ideas.
+
+Backed by an SQLite FTS5 table, search_index, holding one row per person
+(name, card addressee, email, notes) and one per gift idea (idea, notes).
+SQL triggers on people and gift_ideas keep it in sync, so ORM writes, bulk
+inserts and raw SQL are all covered. Rowids are derived from the source
+row (2 * id for people, 2 * id + 1 for ideas) so triggers update a single
+index row by rowid instead of searching for it.
+"""
+import re
+from markupsafe import Markup, escape
+from sqlalchemy.exc import OperationalError
+from models import db, Person
+
+_INSERT = "INSERT INTO search_index (rowid, kind, ref_id, person_id, title, body) "
+
+# Index row for a person / gift idea; {row} is new, or the table when filling
+_PERSON_ROW = (
+    "{row}.id * 2, 'person', {row}.id, {row}.id, {row}.name, "
+    "coalesce({row}.card_addressee, '') || ' ' || coalesce({row}.email, '') || ' ' || coalesce({row}.notes, '')"
+)
+_IDEA_ROW = "{row}.id * 2 + 1, 'idea', {row}.id, {row}.person_id, {row}.idea, coalesce({row}.notes, '')"
+
+_INDEX_PERSON = _INSERT + "VALUES (" + _PERSON_ROW.format(row='new') + ")"
+_INDEX_IDEA = _INSERT + "VALUES (" + _IDEA_ROW.format(row='new') + ")"
+
+SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+        kind UNINDEXED, ref_id UNINDEXED, person_id UNINDEXED, title, body,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    "CREATE TRIGGER IF NOT EXISTS search_people_insert AFTER INSERT ON people BEGIN "
+    + _INDEX_PERSON + "; END",
+    "CREATE TRIGGER IF NOT EXISTS search_people_update "
+    "AFTER UPDATE OF name, card_addressee, email, notes ON people BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 2; "
+    + _INDEX_PERSON + "; END",
+    "CREATE TRIGGER IF NOT EXISTS search_people_delete AFTER DELETE ON people BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 2; END",
+    "CREATE TRIGGER IF NOT EXISTS search_ideas_insert AFTER INSERT ON gift_ideas BEGIN "
+    + _INDEX_IDEA + "; END",
+    "CREATE TRIGGER IF NOT EXISTS search_ideas_update "
+    "AFTER UPDATE OF idea, notes, person_id ON gift_ideas BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 2 + 1; "
+    + _INDEX_IDEA + "; END",
+    "CREATE TRIGGER IF NOT EXISTS search_ideas_delete AFTER DELETE ON gift_ideas BEGIN "
+    "DELETE FROM search_index WHERE rowid = old.id * 2 + 1; END",
+]
+
+# Names (title) outrank notes and email (body); kind/ref_id/person_id are unindexed
+_RANK = 'bm25(search_index, 0, 0, 0, 10.0, 1.0)'
+
+# Highlight markers that can't occur in user text, swapped for <mark> after escaping
+_MARK_START, _MARK_END = '\x02', '\x03'
+
+_search_available = None
+
+
+def search_available():
+    """Return True if this SQLite build has FTS5 and the index exists."""
+    global _search_available
+    if _search_available is None:
+        _search_available = db.session.execute(db.text(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'search_index'"
+        )).scalar() > 0
+    return _search_available
+
+
+def ensure_search_index():
+    """Create the FTS table and triggers, filling the index if it is new."""
+    global _search_available
+    with db.engine.begin() as connection:
+        exists = connection.exec_driver_sql(
+            "SELECT count(*) FROM sqlite_master WHERE name = 'search_index'"
+        ).scalar()
+        try:
+            for statement in SEARCH_DDL:
+                connection.exec_driver_sql(statement)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE on names
+            _search_available = False
+            return
+        if not exists:
+            _fill_search_index(connection)
+    _search_available = True
+
+
+def rebuild_search_index():
+    """Re-index every person and gift idea from scratch."""
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('DELETE FROM search_index')
+        _fill_search_index(connection)
+
+
+def _fill_search_index(connection):
+    connection.exec_driver_sql(_INSERT + "SELECT " + _PERSON_ROW.format(row='people') + " FROM people")
+    connection.exec_driver_sql(_INSERT + "SELECT " + _IDEA_ROW.format(row='gift_ideas') + " FROM gift_ideas")
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query: every word must match as a prefix.
+
+    Punctuation is dropped, so user input can never produce FTS5 syntax
+    errors. Returns None when there is nothing to search for.
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _highlight(snippet):
+    return Markup(str(escape(snippet)).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def search(text, limit=20):
+    """Return up to ``limit`` ranked matches for active people and their ideas.
+
+    Each result is a dict with kind ('person' or 'idea'), person_id,
+    person_name, idea_id (None for people), title and a highlighted snippet.
+    """
+    match = build_match_query(text)
+    if not match:
+        return []
+
+    if not search_available():
+        return _search_names(text, limit)
+
+    # CROSS JOIN keeps SQLite from scanning people and probing the index per row
+    rows = db.session.execute(db.text(f"""
+        SELECT search_index.kind, search_index.ref_id, search_index.person_id,
+               people.name AS person_name, search_index.title,
+               snippet(search_index, -1, :start, :end, '…', 12) AS snippet
+        FROM search_index
+        CROSS JOIN people ON people.id = search_index.person_id
+        WHERE search_index MATCH :match AND people.active = 1
+        ORDER BY {_RANK}
+        LIMIT :limit
+    """), {'match': match, 'start': _MARK_START, 'end': _MARK_END, 'limit': limit})
+
+    return [{
+        'kind': row.kind,
+        'person_id': row.person_id,
+        'person_name': row.person_name,
+        'idea_id': row.ref_id if row.kind == 'idea' else None,
+        'title': row.title,
+        'snippet': _highlight(row.snippet)
+    } for row in rows]
+
+
+def _search_names(text, limit):
+    """Fallback without FTS5: substring match on active people's names."""
+    people = Person.query.filter(
+        Person.active == True,
+        Person.name.ilike(f'%{text.strip()}%')
+    ).order_by(Person.name).limit(limit).all()
+    return [{
+        'kind': 'person',
+        'person_id': person.id,
+        'person_name': person.name,
+        'idea_id': None,
+        'title': person.name,
+        'snippet': escape(person.name)
+    } for person in people]
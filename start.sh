@@ -6,11 +6,15 @@ SCRIPT_DIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
 # Change to the script directory
 cd "$SCRIPT_DIR"
 
-# Check for restart flag
+# Check for restart and production flags
 RESTART=false
-if [[ "$1" == "--restart" ]] || [[ "$1" == "-r" ]]; then
-    RESTART=true
-fi
+PROD=false
+for arg in "$@"; do
+    case "$arg" in
+        --restart|-r) RESTART=true ;;
+        --prod|-p) PROD=true ;;
+    esac
+done
 
 # Check if server is already running on port 7234
 PID=$(lsof -Pi :7234 -sTCP:LISTEN -t 2>/dev/null)
@@ -24,11 +28,17 @@ if [ -n "$PID" ]; then
         echo "Server is already running on port 7234 (PID: $PID)"
         echo "Visit: http://localhost:7234"
         echo "Use --restart or -r flag to restart the server"
+        echo "Use --prod or -p flag to serve with gunicorn instead of the debug server"
         exit 0
     fi
 fi
 
-# Activate virtual environment and start the Flask server
-echo "Starting server on port 7234..."
+# Activate virtual environment and start the server
 source "$SCRIPT_DIR/venv/bin/activate"
-python "$SCRIPT_DIR/app.py"
+if [ "$PROD" = true ]; then
+    echo "Starting production server (gunicorn) on port 7234..."
+    exec gunicorn -c "$SCRIPT_DIR/gunicorn.conf.py" wsgi:app
+else
+    echo "Starting development server on port 7234..."
+    python "$SCRIPT_DIR/app.py"
+fi
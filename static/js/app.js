@@ -11,67 +11,158 @@ document.addEventListener('DOMContentLoaded', function() {
 
 /**
  * Handle task checkbox toggling with AJAX
+ *
+ * Changes are queued and sent together to /api/tasks/batch a moment after
+ * the last click, so ticking down a list costs one request. Clicking a box
+ * twice before the flush cancels out. "Mark all" buttons send at once.
+ * Longer queues go out in batches of TASK_BATCH_SIZE, one after another.
  */
+const TASK_FLUSH_DELAY_MS = 300;
+// Must not exceed TASK_BATCH_LIMIT in app.py, or the server rejects the batch
+const TASK_BATCH_SIZE = 500;
+
 function initTaskCheckboxes() {
     const taskCheckboxes = document.querySelectorAll('.task-checkbox');
+    if (taskCheckboxes.length === 0) {
+        return;
+    }
 
-    taskCheckboxes.forEach(checkbox => {
-        checkbox.addEventListener('change', async function() {
-            const personId = this.dataset.personId;
-            const taskType = this.dataset.taskType;
-            const isChecked = this.checked;
+    // "personId:taskType" -> {checkbox, original state before the first queued change}
+    const pending = new Map();
+    let flushTimer = null;
+    let inFlight = null;
+
+    function queueChange(checkbox) {
+        const key = `${checkbox.dataset.personId}:${checkbox.dataset.taskType}`;
+        const queued = pending.get(key);
+        if (!queued) {
+            pending.set(key, {checkbox: checkbox, original: !checkbox.checked});
+        } else if (queued.original === checkbox.checked) {
+            pending.delete(key);  // Toggled back before it was sent
+        }
+    }
 
-            try {
-                // First, create the task if it doesn't exist (or get existing task ID)
-                const createResponse = await fetch(`/tasks/create/${personId}/${taskType}`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    }
-                });
+    function scheduleFlush(delay) {
+        clearTimeout(flushTimer);
+        flushTimer = setTimeout(flush, delay);
+    }
 
-                const createData = await createResponse.json();
+    function takePending() {
+        const batch = [];
+        for (const [key, item] of pending) {
+            if (batch.length === TASK_BATCH_SIZE) {
+                break;
+            }
+            batch.push(item);
+            pending.delete(key);
+        }
+        return batch;
+    }
 
-                if (!createData.success) {
-                    throw new Error('Failed to create task');
-                }
+    function toMutations(batch) {
+        return batch.map(item => ({
+            person_id: parseInt(item.checkbox.dataset.personId, 10),
+            task_type: item.checkbox.dataset.taskType,
+            completed: item.checkbox.checked
+        }));
+    }
 
-                const taskId = createData.task_id;
+    async function flush() {
+        flushTimer = null;
+        if (inFlight) {
+            // One batch at a time; the rest is sent when this one finishes
+            return;
+        }
 
-                // Now toggle the task
-                const toggleResponse = await fetch(`/tasks/${taskId}/toggle`, {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    }
-                });
+        const batch = takePending();
+        if (batch.length === 0) {
+            return;
+        }
 
-                const toggleData = await toggleResponse.json();
+        inFlight = sendBatch(batch);
+        await inFlight;
+        inFlight = null;
+        if (pending.size > 0 && !flushTimer) {
+            flush();  // The rest of a long queue
+        }
+    }
 
-                if (!toggleData.success) {
-                    throw new Error('Failed to toggle task');
-                }
+    async function sendBatch(batch) {
+        try {
+            const response = await fetch('/api/tasks/batch', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify({mutations: toMutations(batch)})
+            });
+
+            const data = await response.json();
+
+            if (!data.success) {
+                throw new Error(data.error || 'Failed to update tasks');
+            }
 
-                // Update checkbox state to match server
-                this.checked = toggleData.completed;
+            // Update checkbox states to match server
+            const completed = new Map(data.tasks.map(task => [`${task.person_id}:${task.task_type}`, task.completed]));
+            batch.forEach(item => {
+                const key = `${item.checkbox.dataset.personId}:${item.checkbox.dataset.taskType}`;
+                if (completed.has(key) && !pending.has(key)) {
+                    item.checkbox.checked = completed.get(key);
+                }
 
                 // Visual feedback
-                const row = this.closest('tr') || this.closest('.list-group-item');
-                if (row) {
-                    if (toggleData.completed) {
-                        row.classList.add('table-success');
-                        setTimeout(() => row.classList.remove('table-success'), 500);
-                    }
+                const row = item.checkbox.closest('tr') || item.checkbox.closest('.list-group-item');
+                if (row && item.checkbox.checked) {
+                    row.classList.add('table-success');
+                    setTimeout(() => row.classList.remove('table-success'), 500);
+                }
+            });
+
+        } catch (error) {
+            console.error('Error updating tasks:', error);
+            // Revert checkboxes on error, unless they were changed again meanwhile
+            batch.forEach(item => {
+                const key = `${item.checkbox.dataset.personId}:${item.checkbox.dataset.taskType}`;
+                if (!pending.has(key)) {
+                    item.checkbox.checked = item.original;
                 }
+            });
+            alert('Failed to update tasks. Please try again.');
+        }
+    }
 
-            } catch (error) {
-                console.error('Error toggling task:', error);
-                // Revert checkbox on error
-                this.checked = !isChecked;
-                alert('Failed to update task. Please try again.');
-            }
+    taskCheckboxes.forEach(checkbox => {
+        checkbox.addEventListener('change', function() {
+            queueChange(this);
+            scheduleFlush(TASK_FLUSH_DELAY_MS);
+        });
+    });
+
+    document.querySelectorAll('[data-mark-all]').forEach(button => {
+        button.addEventListener('click', function() {
+            const taskType = this.dataset.markAll;
+            taskCheckboxes.forEach(checkbox => {
+                if (checkbox.dataset.taskType === taskType && !checkbox.checked) {
+                    checkbox.checked = true;
+                    queueChange(checkbox);
+                }
+            });
+            scheduleFlush(0);
         });
     });
+
+    // Don't lose queued changes when leaving the page
+    window.addEventListener('pagehide', function() {
+        if (pending.size === 0) {
+            return;
+        }
+        clearTimeout(flushTimer);
+        while (pending.size > 0) {
+            const body = JSON.stringify({mutations: toMutations(takePending())});
+            navigator.sendBeacon('/api/tasks/batch', new Blob([body], {type: 'application/json'}));
+        }
+    });
 }
 
 /**
@@ -123,11 +214,11 @@ function initMilestoneCheckboxes() {
 }
 
 /**
- * Check for year rollover on page load
+ * Check whether the background scheduler has archived a year
  */
 function initRolloverCheck() {
-    // Only check on dashboard
-    if (!window.location.pathname.includes('/') && window.location.pathname !== '/') {
+    // Only check on dashboard, which is where the rollover summary is shown
+    if (window.location.pathname !== '/') {
         return;
     }
 
@@ -0,0 +1,55 @@
+from dataclasses import dataclass, asdict
+from models import db, Person
+from rollups import get_year_rollup
+
+
+@dataclass
+class DashboardStats:
+    """Counts shown on the dashboard for the active planning year."""
+    active_year: int
+    current_phase: str
+    total_people: int
+    people_with_gifts: int
+    handwritten_count: int
+    ecard_count: int
+    total_budget: int
+    gift_tasks_completed: int
+    cards_written: int
+    gifts_given: int
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def count_where(condition):
+    """SQL expression counting the rows that match condition (0, not NULL, for none)."""
+    return db.func.coalesce(db.func.sum(db.case((condition, 1), else_=0)), 0)
+
+
+def load_dashboard_stats(active_year, current_phase):
+    """Compute dashboard stats with one person query and one rollup lookup."""
+    # All person counts in a single conditional aggregate
+    (total_people, people_with_gifts, handwritten_count,
+     ecard_count, total_budget) = db.session.query(
+        db.func.count(Person.id),
+        count_where(Person.gets_gift == True),
+        count_where(Person.card_preference == 'Handwritten'),
+        count_where(Person.card_preference == 'E-card'),
+        db.func.sum(db.case((Person.gets_gift == True, Person.budget), else_=None))
+    ).filter(Person.active == True).one()
+
+    # Completed task counts for the year, from its rollup row
+    rollup = get_year_rollup(active_year)
+
+    return DashboardStats(
+        active_year=active_year,
+        current_phase=current_phase,
+        total_people=total_people,
+        people_with_gifts=people_with_gifts,
+        handwritten_count=handwritten_count,
+        ecard_count=ecard_count,
+        total_budget=total_budget or 0,
+        gift_tasks_completed=rollup.gifts_purchased,
+        cards_written=rollup.cards_written,
+        gifts_given=rollup.gifts_given
+    )
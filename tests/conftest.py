@@ -0,0 +1,88 @@
+"""Shared fixtures for the test suite.
+
+The app is built once with create_app() against a throwaway database, with
+no background scheduler or import threads and no CSRF tokens. Every test
+starts from an empty, initialized database.
+"""
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import create_app, init_database
+    database_dir = tempfile.mkdtemp(prefix='be-thoughtful-tests-')
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_dir}/test.db',
+        'ROLLOVER_SCHEDULER': False,
+        'IMPORT_RUN_IN_BACKGROUND': False,
+        'WTF_CSRF_ENABLED': False,
+    })
+    init_database(app)
+    return app
+
+
+def _reset_database():
+    """Empty every table, then seed the active year as on first start."""
+    import http_cache
+    from models import db
+    from utils import initialize_database, invalidate_active_year_cache
+
+    db.session.remove()
+    for table in reversed(db.metadata.sorted_tables):
+        if table.name != 'data_version':
+            db.session.execute(table.delete())
+    db.session.commit()
+    invalidate_active_year_cache()
+    http_cache._pages.clear()
+    initialize_database()
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+    from models import db
+
+    with app.app_context():
+        _reset_database()
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def reset_database(app):
+    """Start over from an empty database in the middle of a test."""
+    return _reset_database
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_statements(app):
+    """Context manager collecting the SQL statements run inside it."""
+    from sqlalchemy import event
+    from models import db
+
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+    return counting
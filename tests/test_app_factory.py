@@ -0,0 +1,26 @@
+"""create_app builds independent apps."""
+from app import create_app, init_database
+from models import db, Person
+
+
+def test_each_call_builds_a_separate_app(app, tmp_path):
+    other = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/other.db',
+                        'ROLLOVER_SCHEDULER': False, 'PEOPLE_PAGE_SIZE': 7})
+
+    assert other is not app
+    assert other.config['PEOPLE_PAGE_SIZE'] == 7
+    assert app.config['PEOPLE_PAGE_SIZE'] == 50
+    assert {rule.endpoint for rule in other.url_map.iter_rules()} == {rule.endpoint for rule in app.url_map.iter_rules()}
+    assert {'init-db', 'check-indexes', 'backfill-archive-snapshots'} <= set(other.cli.commands)
+
+
+def test_apps_use_their_own_databases(app, tmp_path):
+    other = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/other.db', 'ROLLOVER_SCHEDULER': False})
+    init_database(other)
+    db.session.add(Person(name='Only In Tests'))
+    db.session.commit()
+
+    with other.app_context():
+        assert db.session.scalar(db.select(db.func.count()).select_from(Person)) == 0
+        db.session.remove()
+    assert db.session.scalars(db.select(Person.name)).all() == ['Only In Tests']
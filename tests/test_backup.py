@@ -0,0 +1,137 @@
+"""Snapshots, retention and restore in backup.py."""
+import gzip
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+import backup
+from models import db, Person
+
+
+@pytest.fixture
+def db_file(database):
+    db.session.add(Person(name='Backed Up'))
+    db.session.commit()
+    return db.engine.url.database
+
+
+def _names(path):
+    connection = sqlite3.connect(path)
+    try:
+        return [name for name, in connection.execute('SELECT name FROM people ORDER BY id')]
+    finally:
+        connection.close()
+
+
+def _decompress(snapshot, path):
+    with gzip.open(snapshot, 'rb') as source, open(path, 'wb') as target:
+        target.write(source.read())
+    return path
+
+
+def _old_database(path):
+    connection = sqlite3.connect(path)
+    connection.execute('CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT)')
+    connection.execute("INSERT INTO people (name) VALUES ('Before Restore')")
+    connection.commit()
+    connection.close()
+    return str(path)
+
+
+def test_snapshot_round_trips(db_file, tmp_path):
+    result = backup.create_snapshot(db_file, str(tmp_path))
+
+    assert os.path.basename(result['path']).startswith(backup.SNAPSHOT_PREFIX)
+    assert result['path'].endswith('.db.gz')
+    assert [path for _, path in backup.list_snapshots(str(tmp_path))] == [result['path']]
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(result['path'])]  # No temp files left
+
+    copy = _decompress(result['path'], str(tmp_path / 'copy.db'))
+    backup.integrity_check(copy)
+    assert _names(copy) == ['Backed Up']
+
+
+def test_integrity_check_rejects_a_damaged_file(tmp_path):
+    damaged = tmp_path / 'damaged.db'
+    damaged.write_bytes(b'SQLite format 3\x00' + b'\x00' * 200)
+
+    with pytest.raises((backup.BackupError, sqlite3.DatabaseError)):
+        backup.integrity_check(str(damaged))
+
+
+def test_prune_keeps_newest_per_hour_day_and_week(tmp_path):
+    def snapshot(stamp, prefix=backup.SNAPSHOT_PREFIX, suffix='.db.gz'):
+        path = tmp_path / f'{prefix}{datetime.fromisoformat(stamp):%Y%m%d_%H%M%S}{suffix}'
+        path.write_bytes(b'')
+        return str(path)
+
+    kept = [
+        snapshot('2025-12-25 12:30'),  # Newest: first hour, day and ISO week 52
+        snapshot('2025-12-25 11:45'),  # Second hour
+        snapshot('2025-12-24 23:00'),  # Second day
+        snapshot('2025-12-17 10:00'),  # Second week (51)
+        snapshot('2025-01-01 00:00', prefix=backup.SAFETY_PREFIX),  # Safety backups stay
+        snapshot('2024-01-01 00:00', suffix='.db'),  # So do old uncompressed backups
+    ]
+    pruned = [
+        snapshot('2025-12-25 12:10'),  # Same hour as a newer one
+        snapshot('2025-12-25 09:00'),  # Third hour, same day and week
+        snapshot('2025-12-23 08:00'),  # Third day, same week
+        snapshot('2025-12-10 10:00'),  # Third week
+    ]
+
+    deleted = backup.prune_snapshots(str(tmp_path), {'hourly': 2, 'daily': 2, 'weekly': 2})
+
+    assert sorted(deleted) == sorted(pruned)
+    assert sorted(str(path) for path in tmp_path.iterdir()) == sorted(kept)
+
+
+def test_restore_saves_current_database_before_overwriting(db_file, tmp_path, monkeypatch):
+    snapshot = backup.create_snapshot(db_file, str(tmp_path / 'snapshots'))['path']
+    target = _old_database(tmp_path / 'target.db')
+    backups_dir = str(tmp_path / 'backups')
+
+    seen_at_safety_backup = []
+    create_snapshot = backup.create_snapshot
+
+    def recording_create_snapshot(source, *args, **kwargs):
+        seen_at_safety_backup.append(_names(source))
+        return create_snapshot(source, *args, **kwargs)
+    monkeypatch.setattr(backup, 'create_snapshot', recording_create_snapshot)
+
+    safety = backup.restore_snapshot(snapshot, target, backups_dir)
+
+    assert seen_at_safety_backup == [['Before Restore']]
+    assert os.path.basename(safety).startswith(backup.SAFETY_PREFIX)
+    assert _names(_decompress(safety, str(tmp_path / 'safety.db'))) == ['Before Restore']
+    assert _names(target) == ['Backed Up']
+    assert backup.prune_snapshots(backups_dir) == []  # Never pruned
+
+
+def test_failed_safety_backup_leaves_database_untouched(db_file, tmp_path, monkeypatch):
+    snapshot = backup.create_snapshot(db_file, str(tmp_path / 'snapshots'))['path']
+    target = _old_database(tmp_path / 'target.db')
+
+    def failing_create_snapshot(*args, **kwargs):
+        raise backup.BackupError('disk full')
+    monkeypatch.setattr(backup, 'create_snapshot', failing_create_snapshot)
+
+    with pytest.raises(backup.BackupError):
+        backup.restore_snapshot(snapshot, target, str(tmp_path / 'backups'))
+
+    assert _names(target) == ['Before Restore']
+    assert sorted(os.listdir(tmp_path)) == ['snapshots', 'target.db']
+
+
+def test_restore_rejects_a_corrupt_snapshot(tmp_path):
+    target = _old_database(tmp_path / 'target.db')
+    corrupt = tmp_path / 'database_20251225_120000.db.gz'
+    with gzip.open(corrupt, 'wb') as f:
+        f.write(b'SQLite format 3\x00' + b'\x00' * 200)
+
+    with pytest.raises((backup.BackupError, sqlite3.DatabaseError)):
+        backup.restore_snapshot(str(corrupt), target, str(tmp_path / 'backups'))
+
+    assert _names(target) == ['Before Restore']
+    assert not (tmp_path / 'backups').exists()
@@ -0,0 +1,32 @@
+"""Form-time duplicate checks on oversized name blocks."""
+from duplicates import MAX_BLOCK_SIZE, find_duplicates, index_people, match_keys
+from models import db, Person
+
+
+def _add_people(rows):
+    db.session.execute(db.insert(Person), rows)
+    db.session.commit()
+    person_ids = db.session.scalars(db.select(Person.id)).all()
+    index_people(person_ids)
+    db.session.commit()
+
+
+def test_exact_email_match_found_beyond_a_full_name_block():
+    common = [{'name': 'Jane Smith', 'active': True} for _ in range(MAX_BLOCK_SIZE + 50)]
+    # Inserted last, so an unordered capped read of the n:j-s530 block skips it
+    _add_people(common + [{'name': 'Jo Smyth', 'email': 'jo@example.com', 'active': True}])
+    assert 'n:j-s530' in match_keys('Jack Smith', None, None)
+
+    matches = find_duplicates('Jack Smith', email='Jo+cards@Example.com')
+
+    assert [match['person'].email for match in matches] == ['jo@example.com']
+    assert matches[0]['reasons'][0] == 'same email'
+
+
+def test_same_name_is_read_first_from_a_full_name_block():
+    _add_people([{'name': f'Jim Smith{i}', 'active': True} for i in range(MAX_BLOCK_SIZE + 50)]
+                + [{'name': 'Jane Smith', 'active': True}])
+
+    matches = find_duplicates('Jane Smith')
+
+    assert [match['person'].name for match in matches][:1] == ['Jane Smith']
@@ -0,0 +1,84 @@
+from importers import EcardDeliveryImporter
+from models import db, Person, EcardDelivery
+
+
+def _person(name, email=None, phone=None, active=True):
+    person = Person(name=name, email=email, phone=phone, active=active)
+    db.session.add(person)
+    db.session.flush()
+    return person
+
+
+def _row(name, contact, contact_type, status='Sent', message=''):
+    return {'Full Name': name, 'Email/Phone Number': contact, 'Type': contact_type,
+            'Status': status, 'Message': message}
+
+
+def _import(rows, year=2024):
+    importer = EcardDeliveryImporter(year)
+    importer.add_rows(rows)
+    db.session.commit()
+    return importer
+
+
+def _recipient(contact):
+    return db.session.scalar(db.select(EcardDelivery.person_id).where(EcardDelivery.contact_used == contact))
+
+
+def test_sms_matches_normalized_phone_before_name():
+    by_phone = _person('Pat Phone', phone='5551234567')
+    _person('Sam Name')
+
+    _import([_row('Sam Name', '(555) 123-4567', 'sms')])
+
+    assert _recipient('5551234567') == by_phone.id
+
+
+def test_email_match_is_exact():
+    # Same as the old per-row lookup: case differences fall back to the name
+    _person('Ann Lee', email='Ann.Lee@Example.com')
+    by_name = _person('A. Lee')
+
+    importer = _import([_row('A. Lee', 'ann.lee@example.com', 'email')])
+
+    assert importer.imported_count == 1
+    assert _recipient('ann.lee@example.com') == by_name.id
+
+
+def test_email_match_wins_over_name():
+    by_email = _person('Ann Lee', email='ann@example.com')
+    _person('Bob Ray', email='bob@example.com')
+
+    _import([_row('Bob Ray', 'ann@example.com', 'email')])
+
+    assert _recipient('ann@example.com') == by_email.id
+
+
+def test_email_differing_in_case_only_is_skipped_without_a_name_match():
+    _person('Cat Case', email='Cat@Example.com')
+
+    importer = _import([_row('Someone Else', 'cat@example.com', 'email')])
+
+    assert (importer.imported_count, importer.skipped_count) == (0, 1)
+
+
+def test_name_fallback_skips_inactive_people_and_takes_lowest_id():
+    _person('Cy Dup', active=False)
+    first = _person('Cy Dup')
+    _person('Cy Dup')
+
+    _import([_row('Cy Dup', 'unknown@example.com', 'email')])
+
+    assert _recipient('unknown@example.com') == first.id
+
+
+def test_unmatched_rows_are_skipped_and_reimport_updates():
+    _person('Di Known', email='di@example.com')
+
+    first = _import([_row('Di Known', 'di@example.com', 'email'), _row('Nobody', 'x@example.com', 'email')])
+    second = _import([_row('Di Known', 'di@example.com', 'email', status='Bounced', message='Thanks!')])
+
+    assert (first.imported_count, first.skipped_count) == (1, 1)
+    assert (second.imported_count, second.updated_count) == (0, 1)
+    delivery = EcardDelivery.query.one()
+    assert (delivery.status, delivery.message) == ('Bounced', 'Thanks!')
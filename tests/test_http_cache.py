@@ -0,0 +1,67 @@
+"""Archived-year pages are cached by their snapshot, not by every write."""
+import pytest
+import http_cache
+from archives import backfill_archive_snapshots, refresh_snapshot_deliveries
+from models import db, Person
+from utils import get_active_year, perform_rollover, set_task_state
+
+
+@pytest.fixture
+def archived_year(client):
+    year = get_active_year()
+    person = Person(name='Ada Lovelace', gets_gift=True)
+    db.session.add(person)
+    db.session.commit()
+    set_task_state(person.id, 'gift_given', year, completed=True)
+    db.session.commit()
+    perform_rollover(year, year + 1)
+    return year
+
+
+def test_task_toggle_keeps_archive_pages(client, archived_year):
+    detail = client.get(f'/archive/{archived_year}')
+    listing = client.get('/archive')
+    assert detail.status_code == listing.status_code == 200
+
+    person_id = db.session.scalar(db.select(Person.id))
+    set_task_state(person_id, 'card_written', get_active_year())
+    db.session.commit()
+
+    assert client.get(f'/archive/{archived_year}').get_etag() == detail.get_etag()
+    assert client.get('/archive').get_etag() == listing.get_etag()
+    revalidated = client.get(f'/archive/{archived_year}', headers={'If-None-Match': detail.get_etag()[0]})
+    assert revalidated.status_code == 304
+
+
+def test_stored_archive_page_survives_writes(client, archived_year, monkeypatch):
+    client.get(f'/archive/{archived_year}')
+    db.session.add(Person(name='Grace Hopper'))
+    db.session.commit()
+
+    views = []
+    monkeypatch.setattr(http_cache, '_store_page', lambda etag, body: views.append(etag))
+    assert client.get(f'/archive/{archived_year}').status_code == 200
+    assert views == []  # Served from memory, not rendered again
+
+
+def test_snapshot_writes_change_archive_etag(client, archived_year):
+    first = client.get(f'/archive/{archived_year}').get_etag()
+
+    backfill_archive_snapshots(rebuild=True)
+    rebuilt = client.get(f'/archive/{archived_year}').get_etag()
+    assert rebuilt != first
+
+    refresh_snapshot_deliveries(archived_year)
+    db.session.commit()
+    assert client.get(f'/archive/{archived_year}').get_etag() != rebuilt
+
+
+def test_missing_archive_year_is_404(client):
+    assert client.get('/archive/1999').status_code == 404
+
+
+def test_live_pages_follow_every_write(client):
+    first = client.get('/ecard-deliveries').get_etag()
+    db.session.add(Person(name='Grace Hopper'))
+    db.session.commit()
+    assert client.get('/ecard-deliveries').get_etag() != first
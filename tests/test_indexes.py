@@ -0,0 +1,51 @@
+from migrations import check_query_plans, create_missing_indexes
+from models import db
+
+
+def test_hot_queries_use_indexes():
+    results = check_query_plans()
+    scans = {label: plan for label, plan, uses_index in results if not uses_index}
+
+    assert len(results) >= 10
+    assert not scans, f'hot queries scanning a table: {scans}'
+
+
+def _fresh_plans():
+    # sqlite3 caches prepared statements per connection, and a cached EXPLAIN
+    # keeps reporting the plan from before a schema change
+    db.session.remove()
+    db.engine.dispose()
+    return check_query_plans()
+
+
+def test_missing_indexes_are_created_on_existing_databases():
+    declared = {index.name for table in db.metadata.sorted_tables for index in table.indexes}
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('DROP INDEX ix_people_active_name')
+        connection.exec_driver_sql('DROP INDEX ix_tasks_year_type_completed')
+    scans = {label for label, plan, uses_index in _fresh_plans() if not uses_index}
+    assert 'completed tasks for year' in scans
+
+    create_missing_indexes()
+
+    existing = set(db.session.scalars(db.text("SELECT name FROM sqlite_master WHERE type = 'index'")))
+    assert declared <= existing
+    assert all(uses_index for label, plan, uses_index in _fresh_plans())
+
+
+def test_full_index_scan_is_reported():
+    # Without its composite index the planner walks an added_date index to
+    # skip the sort: an index is used, but every gift idea is read
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql('DROP INDEX ix_gift_ideas_person_used_added')
+        connection.exec_driver_sql('CREATE INDEX ix_gift_ideas_added ON gift_ideas (added_date)')
+    try:
+        plans = {label: (plan, uses_index) for label, plan, uses_index in _fresh_plans()}
+        plan, uses_index = plans['unused gift ideas']
+        assert plan[0].startswith('SCAN gift_ideas USING INDEX ix_gift_ideas_added')
+        assert not uses_index
+    finally:
+        with db.engine.begin() as connection:
+            connection.exec_driver_sql('DROP INDEX ix_gift_ideas_added')
+        create_missing_indexes()
+        _fresh_plans()
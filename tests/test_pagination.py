@@ -0,0 +1,84 @@
+import random
+
+import pytest
+from models import db, Person
+from pagination import paginate_people, encode_cursor
+
+TYPES = ['Family', 'Close Friend', 'Colleague', None]
+BUDGETS = [25, 50, 50, 100, None]
+
+
+@pytest.fixture
+def people():
+    rng = random.Random(5)
+    # Few distinct names, types and budgets, so most sort keys tie until the id
+    rows = [Person(name=rng.choice(['Ann', 'Bob', 'Cy', 'Di', 'Ed']) + f' {rng.randrange(4)}',
+                   person_type=rng.choice(TYPES), budget=rng.choice(BUDGETS),
+                   active=rng.random() > 0.1)
+            for _ in range(130)]
+    db.session.add_all(rows)
+    db.session.commit()
+    return [person for person in rows if person.active]
+
+
+EXPECTED_ORDER = {
+    'name': lambda p: (p.name, p.id),
+    'type': lambda p: (p.person_type or '', p.name, p.id),
+    'budget': lambda p: (-(p.budget or 0), p.name, p.id),
+}
+
+
+def _walk(sort, per_page):
+    ids, cursor, pages = [], None, 0
+    while True:
+        page, cursor = paginate_people(Person.query.filter_by(active=True), sort, cursor, per_page)
+        ids.extend(person.id for person in page)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+@pytest.mark.parametrize('sort', sorted(EXPECTED_ORDER))
+@pytest.mark.parametrize('per_page', [1, 7, 50, 500])
+def test_pages_follow_sort_order_without_gaps_or_repeats(people, sort, per_page):
+    ids, pages = _walk(sort, per_page)
+
+    assert ids == [person.id for person in sorted(people, key=EXPECTED_ORDER[sort])]
+    assert pages == max(1, -(-len(people) // per_page))
+
+
+def test_page_after_cursor_starts_strictly_after_it(people):
+    first, cursor = paginate_people(Person.query.filter_by(active=True), 'budget', per_page=10)
+    second, _ = paginate_people(Person.query.filter_by(active=True), 'budget', cursor, per_page=10)
+
+    key = EXPECTED_ORDER['budget']
+    assert key(first[-1]) < key(second[0])
+
+
+def test_rows_added_before_the_cursor_do_not_shift_later_pages(people):
+    query = Person.query.filter_by(active=True)
+    _, cursor = paginate_people(query, 'name', per_page=20)
+    before, _ = paginate_people(query, 'name', cursor, per_page=20)
+
+    db.session.add(Person(name='Aaron', active=True))
+    db.session.commit()
+    after, _ = paginate_people(query, 'name', cursor, per_page=20)
+
+    assert [p.id for p in after] == [p.id for p in before]
+
+
+def test_api_walks_every_page_and_rejects_bad_cursors(app, client, people, monkeypatch):
+    monkeypatch.setitem(app.config, 'PEOPLE_PAGE_SIZE', 9)
+    ids, cursor = [], None
+    while True:
+        data = client.get('/api/people', query_string={'sort': 'type', 'after': cursor or ''}).get_json()
+        ids.extend(person['id'] for person in data['people'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+
+    assert ids == [person.id for person in sorted(people, key=EXPECTED_ORDER['type'])]
+    assert client.get('/api/people?after=not-a-cursor').status_code == 400
+    assert client.get('/api/people', query_string={'after': encode_cursor(['Ann'])}).status_code == 400
+    # The HTML page starts over from the first page instead
+    assert client.get('/people?after=not-a-cursor').status_code == 200
@@ -0,0 +1,41 @@
+"""The list pages must run a fixed number of statements however much data there is."""
+import pytest
+from synthetic_data import generate
+
+PAGES = ['/shopping-list', '/writing-queue']
+
+
+def _statements_per_page(client, count_statements):
+    counts = {}
+    for url in PAGES:
+        client.get(url)  # Warm per-process caches (active year, milestones)
+        with count_statements() as statements:
+            response = client.get(url)
+        assert response.status_code == 200
+        counts[url] = len(statements)
+    return counts
+
+
+@pytest.mark.parametrize('small, large', [(20, 400)])
+def test_list_pages_do_not_query_per_person(app, client, count_statements, small, large):
+    with app.app_context():
+        generate(people=small, years=0, seed=1)
+    small_counts = _statements_per_page(client, count_statements)
+
+    with app.app_context():
+        generate(people=large - small, years=0, seed=2)
+    large_counts = _statements_per_page(client, count_statements)
+
+    assert large_counts == small_counts
+    # A few grouped loader queries; one query per person would blow far past this
+    assert all(count <= 6 for count in large_counts.values()), large_counts
+
+
+def test_list_pages_render_everyone(app, client):
+    with app.app_context():
+        counts = generate(people=50, years=0, seed=3)
+        from models import Person
+        gift_people = Person.query.filter_by(active=True, gets_gift=True).count()
+
+    assert counts['people'] == 50
+    assert f'{gift_people} people getting gifts' in client.get('/shopping-list').get_data(as_text=True)
@@ -0,0 +1,84 @@
+"""Differential test: the set-based rollover against the original per-row one."""
+from datetime import date
+
+import pytest
+from synthetic_data import generate
+from models import db, AnnualSummary, GiftIdea, Milestone, Person, Task
+from utils import get_active_year, perform_rollover, seed_milestones_for_year
+
+SUMMARY_FIELDS = ('year', 'total_people', 'gifts_given', 'handwritten_cards', 'ecards_sent', 'completed_date')
+
+
+def legacy_perform_rollover(old_year, new_year):
+    """perform_rollover as it was before the set-based rewrite (one query per gift)."""
+    total_people = Person.query.filter_by(active=True).count()
+    gifts_given = Task.query.filter_by(year=old_year, task_type='gift_given', completed=True).count()
+    handwritten_cards = Task.query.filter(
+        Task.year == old_year, Task.task_type == 'card_written', Task.completed == True
+    ).join(Person).filter(Person.card_preference == 'Handwritten').count()
+    ecards_sent = Task.query.filter(
+        Task.year == old_year, Task.task_type == 'card_written', Task.completed == True
+    ).join(Person).filter(Person.card_preference == 'E-card').count()
+
+    db.session.add(AnnualSummary(
+        year=old_year,
+        total_people=total_people,
+        gifts_given=gifts_given,
+        handwritten_cards=handwritten_cards,
+        ecards_sent=ecards_sent,
+        completed_date=date.today()
+    ))
+
+    for task in Task.query.filter_by(year=old_year, task_type='gift_given', completed=True).all():
+        if task.person_id:
+            gift_idea = GiftIdea.query.filter_by(
+                person_id=task.person_id, used_year=None
+            ).order_by(GiftIdea.added_date.desc()).first()
+            if gift_idea:
+                gift_idea.used_year = old_year
+
+    seed_milestones_for_year(new_year)
+    db.session.commit()
+
+
+def _fill(seed):
+    generate(people=300, years=2, seed=seed)
+    year = get_active_year()
+    # A completed gift without a person must not mark anything
+    db.session.add(Task(person_id=None, year=year, task_type='gift_given', description='loose', completed=True))
+    db.session.commit()
+    return year
+
+
+def _outcome(year):
+    summary = db.session.execute(
+        db.select(*(getattr(AnnualSummary, field) for field in SUMMARY_FIELDS)).where(AnnualSummary.year == year)
+    ).one()
+    # Ideas added on the same day tie for "most recent", so compare the dates
+    # of the ideas each person had marked rather than which row won a tie
+    used = {}
+    for person_id, used_year, added_date in db.session.execute(
+        db.select(GiftIdea.person_id, GiftIdea.used_year, GiftIdea.added_date)
+        .where(GiftIdea.used_year.isnot(None)).order_by(GiftIdea.added_date)
+    ):
+        used.setdefault((person_id, used_year), []).append(added_date)
+    milestones = db.session.execute(
+        db.select(Milestone.year, db.func.count()).group_by(Milestone.year).order_by(Milestone.year)
+    ).all()
+    return tuple(summary), used, milestones
+
+
+@pytest.mark.parametrize('seed', [1, 7])
+def test_rollover_matches_legacy_implementation(app, reset_database, seed):
+    year = _fill(seed)
+    legacy_perform_rollover(year, year + 1)
+    expected = _outcome(year)
+
+    reset_database()
+    assert _fill(seed) == year
+    perform_rollover(year, year + 1)
+    actual = _outcome(year)
+
+    assert actual == expected
+    assert expected[1], 'generated data should include given gifts with ideas'
+    assert any(used_year == year for _, used_year in expected[1])
@@ -0,0 +1,36 @@
+from synthetic_data import generate
+from models import db, EcardDelivery, Task, YearRollup
+from rollups import check_year_rollups, rebuild_year_rollups, get_year_rollup
+from utils import get_active_year
+
+
+def test_triggers_keep_counters_exact_through_writes(app):
+    generate(people=200, years=2, seed=4)
+    year = get_active_year()
+    assert check_year_rollups() == []
+
+    tasks = Task.query.filter_by(year=year).limit(40).all()
+    for task in tasks[:20]:
+        task.completed = not task.completed
+    for task in tasks[20:30]:
+        task.year = year + 5  # A year with no tasks yet, so no duplicates
+    for task in tasks[30:]:
+        db.session.delete(task)
+    db.session.execute(db.update(EcardDelivery).where(EcardDelivery.year == year - 1).values(status='Bounced'))
+    db.session.execute(db.delete(EcardDelivery).where(EcardDelivery.id % 3 == 0))
+    db.session.commit()
+
+    assert check_year_rollups() == []
+
+
+def test_checker_reports_drift_and_rebuild_repairs_it(app):
+    generate(people=50, years=1, seed=5)
+    year = get_active_year()
+    stored = get_year_rollup(year).cards_written
+    db.session.execute(db.update(YearRollup).where(YearRollup.year == year).values(cards_written=stored + 3))
+    db.session.commit()
+
+    assert check_year_rollups() == [(year, 'cards_written', stored + 3, stored)]
+
+    rebuild_year_rollups()
+    assert check_year_rollups() == []
@@ -0,0 +1,22 @@
+import pytest
+from models import db, Person
+
+
+@pytest.fixture
+def smiths():
+    db.session.add_all(Person(name=f'Sam Smith {i}', active=True) for i in range(120))
+    db.session.commit()
+
+
+@pytest.mark.parametrize('limit, expected', [('0', 1), ('-1', 1), ('-50', 1), ('3', 3), ('1000', 100)])
+def test_api_search_limit_is_clamped(client, smiths, limit, expected):
+    data = client.get('/api/search', query_string={'q': 'smith', 'limit': limit}).get_json()
+
+    assert data['success']
+    assert len(data['results']) == expected
+
+
+def test_api_search_default_limit(app, client, smiths):
+    data = client.get('/api/search?q=smith').get_json()
+
+    assert len(data['results']) == app.config['SEARCH_RESULTS_LIMIT']
@@ -0,0 +1,31 @@
+"""Cold start: importing the app is cheap and leaves the database alone."""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from cold_start import CHILD, ROOT, run_child
+
+# Same defaults as benchmarks/cold_start.py
+IMPORT_BUDGET_MS = 1500
+FIRST_RESPONSE_BUDGET_MS = 1000
+
+
+def test_import_does_not_touch_database_or_load_forms(tmp_path):
+    database = tmp_path / 'untouched.db'
+    code = ("import sys, app; "
+            "print(sorted(m for m in ('forms', 'wtforms', 'email_validator', 'importers') if m in sys.modules))")
+    env = dict(os.environ, FLASK_SQLALCHEMY_DATABASE_URI=f'sqlite:///{database}')
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env,
+                            check=True, capture_output=True, text=True).stdout
+
+    assert output.strip() == '[]'
+    assert not database.exists()
+
+
+def test_cold_start_within_budget():
+    runs = [json.loads(run_child(CHILD).stdout.strip().splitlines()[-1]) for _ in range(3)]
+
+    assert statistics.median(run['import_ms'] for run in runs) < IMPORT_BUDGET_MS
+    assert statistics.median(run['first_response_ms'] for run in runs) < FIRST_RESPONSE_BUDGET_MS
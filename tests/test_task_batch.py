@@ -0,0 +1,51 @@
+"""Marking every task done on lists longer than one batch."""
+import os
+import re
+
+from conftest import ROOT
+from models import db, Person, Task
+from utils import get_active_year
+
+PEOPLE = 1200
+
+
+def _client_batch_size():
+    with open(os.path.join(ROOT, 'static', 'js', 'app.js')) as f:
+        return int(re.search(r'const TASK_BATCH_SIZE = (\d+);', f.read()).group(1))
+
+
+def _mark_all(client, person_ids, task_type):
+    """Send the requests app.js makes for "Mark All": the queue in batches."""
+    size = _client_batch_size()
+    for start in range(0, len(person_ids), size):
+        mutations = [{'person_id': person_id, 'task_type': task_type, 'completed': True}
+                     for person_id in person_ids[start:start + size]]
+        response = client.post('/api/tasks/batch', json={'mutations': mutations})
+        assert response.status_code == 200, response.get_json()
+        assert len(response.get_json()['tasks']) == len(mutations)
+
+
+def test_client_batches_fit_the_server_limit(app):
+    assert 0 < _client_batch_size() <= app.config['TASK_BATCH_LIMIT']
+
+
+def test_mark_all_on_more_rows_than_one_batch(app, client):
+    assert PEOPLE > app.config['TASK_BATCH_LIMIT']
+    db.session.execute(db.insert(Person), [
+        {'name': f'Person {i}', 'card_preference': 'Handwritten'} for i in range(PEOPLE)
+    ])
+    db.session.commit()
+    person_ids = db.session.scalars(db.select(Person.id).order_by(Person.id)).all()
+
+    _mark_all(client, person_ids, 'card_written')
+
+    completed = db.session.scalar(db.select(db.func.count()).select_from(Task).where(
+        Task.year == get_active_year(), Task.task_type == 'card_written', Task.completed == True
+    ))
+    assert completed == PEOPLE
+
+
+def test_oversized_batch_is_rejected(app, client):
+    mutations = [{'person_id': 1, 'task_type': 'card_written', 'completed': True}] * (app.config['TASK_BATCH_LIMIT'] + 1)
+    response = client.post('/api/tasks/batch', json={'mutations': mutations})
+    assert response.status_code == 400
@@ -1,6 +1,14 @@
 from datetime import date, datetime
 import re
-from models import db, Milestone, AnnualSummary, Task, GiftIdea, Person
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, has_app_context, current_app
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, Milestone, MilestoneSubtask, AnnualSummary, Task, GiftIdea, Person
+from migrations import apply_schema_migrations
+from archives import write_archive_snapshot
+from stats import count_where
 
 
 def normalize_phone(phone):
@@ -71,6 +79,34 @@ MILESTONE_SUBTASKS = {
 }
 
 
+# Process-wide cache of the active year. The value only changes when a year
+# is archived, so perform_rollover() invalidates it explicitly; the TTL
+# (ACTIVE_YEAR_CACHE_TTL, seconds) bounds staleness across worker processes.
+_active_year_cache = {'base_year': None, 'value': None, 'expires': 0.0}
+_active_year_cache_lock = threading.Lock()
+_active_year_cache_counters = {'request_hits': 0, 'process_hits': 0, 'misses': 0}
+
+
+def _count_cache(counter):
+    with _active_year_cache_lock:
+        _active_year_cache_counters[counter] += 1
+
+
+def active_year_cache_info():
+    """Return hit/miss counters for the active year cache."""
+    with _active_year_cache_lock:
+        return dict(_active_year_cache_counters)
+
+
+def invalidate_active_year_cache():
+    """Forget the cached active year and phase (call after archiving a year)."""
+    with _active_year_cache_lock:
+        _active_year_cache.update(base_year=None, value=None, expires=0.0)
+    if has_app_context():
+        g.pop('active_year', None)
+        g.pop('current_phase', None)
+
+
 def get_active_year():
     """Return the year we're currently planning for.
 
@@ -78,24 +114,62 @@ def get_active_year():
     January 1 - August 31: Next year
 
     If the current year has been archived, return next year instead.
+
+    Memoized on flask.g for the request, and process-wide for
+    ACTIVE_YEAR_CACHE_TTL seconds.
     """
     today = date.today()
     base_year = today.year if today.month >= 9 else today.year + 1
 
+    if 'active_year' in g:
+        _count_cache('request_hits')
+        return g.active_year
+
+    with _active_year_cache_lock:
+        cached = _active_year_cache
+        if cached['base_year'] == base_year and cached['expires'] > time.monotonic():
+            _active_year_cache_counters['process_hits'] += 1
+            g.active_year = cached['value']
+            return g.active_year
+
+    _count_cache('misses')
+
     # Check if this year has already been archived
-    from models import AnnualSummary
     if AnnualSummary.query.filter_by(year=base_year).first():
         # Already archived, move to next year
-        return base_year + 1
+        active_year = base_year + 1
+    else:
+        active_year = base_year
 
-    return base_year
+    ttl = current_app.config.get('ACTIVE_YEAR_CACHE_TTL', 300)
+    with _active_year_cache_lock:
+        _active_year_cache.update(base_year=base_year, value=active_year,
+                                  expires=time.monotonic() + ttl)
+    g.active_year = active_year
+    return active_year
 
 
-def get_current_phase():
-    """Return the current planning phase based on today's date."""
+def get_current_phase(active_year=None):
+    """Return the current planning phase based on today's date.
+
+    Pass active_year if the caller already has it, to skip a second lookup.
+    The result is memoized on flask.g for the request.
+    """
     today = date.today()
-    active_year = get_active_year()
+    if active_year is None:
+        active_year = get_active_year()
+
+    cached = g.get('current_phase')
+    if cached and cached[0] == active_year:
+        return cached[1]
 
+    phase = _phase_for(today, active_year)
+    g.current_phase = (active_year, phase)
+    return phase
+
+
+def _phase_for(today, active_year):
+    """Map a date to its planning phase for the given active year."""
     # If we're planning for next year (Jan-Aug), we're in pre-planning
     if today.year < active_year:
         return 'Pre-planning'
@@ -132,8 +206,11 @@ def days_until_christmas(active_year):
     }
 
 
-def seed_milestones_for_year(year):
-    """Create milestone templates for a given year."""
+def seed_milestones_for_year(year, commit=True):
+    """Create milestone templates for a given year.
+
+    Pass commit=False to leave the new milestones in the caller's transaction.
+    """
     milestone_templates = [
         {
             'phase': 'September',
@@ -165,12 +242,13 @@ def seed_milestones_for_year(year):
                 description=template['description'],
                 year=year,
                 completed=False,
-                subtasks=subtasks,
-                completed_subtasks=[]
+                subtasks=[MilestoneSubtask(position=position, description=description)
+                          for position, description in enumerate(subtasks)]
             )
             db.session.add(milestone)
 
-    db.session.commit()
+    if commit:
+        db.session.commit()
 
 
 def check_and_perform_rollover():
@@ -196,6 +274,69 @@ def check_and_perform_rollover():
     return None
 
 
+@contextmanager
+def _timed_stage(timings, stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _rollover_counts(old_year):
+    """Compute every annual summary counter for a year in one statement."""
+    total_people = db.select(db.func.count(Person.id)).where(
+        Person.active == True
+    ).correlate(None).scalar_subquery()
+
+    card_written = Task.task_type == 'card_written'
+
+    # Tasks without a person (or a matching preference) fall out of the card counts
+    return db.session.query(
+        total_people,
+        count_where(Task.task_type == 'gift_given'),
+        count_where(db.and_(card_written, Person.card_preference == 'Handwritten')),
+        count_where(db.and_(card_written, Person.card_preference == 'E-card'))
+    ).select_from(Task).outerjoin(Person, Task.person_id == Person.id).filter(
+        Task.year == old_year,
+        Task.completed == True
+    ).one()
+
+
+def _mark_given_gift_ideas(old_year):
+    """Mark the newest unused idea as used for each completed gift_given task.
+
+    One windowed UPDATE: ideas are ranked newest-first per person, and each
+    person gets as many ideas marked as they have completed gift tasks.
+    """
+    given = db.select(
+        Task.person_id,
+        db.func.count().label('gifts')
+    ).where(
+        Task.year == old_year,
+        Task.task_type == 'gift_given',
+        Task.completed == True,
+        Task.person_id.isnot(None)
+    ).group_by(Task.person_id).subquery()
+
+    ranked = db.select(
+        GiftIdea.id,
+        given.c.gifts,
+        db.func.row_number().over(
+            partition_by=GiftIdea.person_id,
+            order_by=(GiftIdea.added_date.desc(), GiftIdea.id)
+        ).label('position')
+    ).join(given, given.c.person_id == GiftIdea.person_id).where(
+        GiftIdea.used_year == None
+    ).subquery()
+
+    db.session.execute(
+        db.update(GiftIdea).where(
+            GiftIdea.id.in_(db.select(ranked.c.id).where(ranked.c.position <= ranked.c.gifts))
+        ).values(used_year=old_year).execution_options(synchronize_session=False)
+    )
+
+
 def perform_rollover(old_year, new_year):
     """Perform the year rollover process.
 
@@ -203,70 +344,53 @@ def perform_rollover(old_year, new_year):
     2. Mark gift ideas as used if gift was given
     3. Create new milestones for new year
     4. Reset task completion states
+    5. Snapshot the completed year for the archive pages
+
+    Everything runs in a single transaction; each stage is timed and logged.
 
     Returns summary dict with stats from old year.
     """
-    # Calculate stats for annual summary
-    total_people = Person.query.filter_by(active=True).count()
-
-    # Count completed gift tasks
-    gifts_given = Task.query.filter_by(
-        year=old_year,
-        task_type='gift_given',
-        completed=True
-    ).count()
-
-    # Count completed handwritten cards
-    handwritten_cards = Task.query.filter(
-        Task.year == old_year,
-        Task.task_type == 'card_written',
-        Task.completed == True
-    ).join(Person).filter(
-        Person.card_preference == 'Handwritten'
-    ).count()
+    timings = {}
+    try:
+        # Calculate stats for annual summary
+        with _timed_stage(timings, 'counts'):
+            total_people, gifts_given, handwritten_cards, ecards_sent = _rollover_counts(old_year)
+
+        # Create annual summary
+        with _timed_stage(timings, 'summary'):
+            summary = AnnualSummary(
+                year=old_year,
+                total_people=total_people,
+                gifts_given=gifts_given,
+                handwritten_cards=handwritten_cards,
+                ecards_sent=ecards_sent,
+                completed_date=date.today()
+            )
+            db.session.add(summary)
+            db.session.flush()
 
-    # Count completed e-cards
-    ecards_sent = Task.query.filter(
-        Task.year == old_year,
-        Task.task_type == 'card_written',
-        Task.completed == True
-    ).join(Person).filter(
-        Person.card_preference == 'E-card'
-    ).count()
-
-    # Create annual summary
-    summary = AnnualSummary(
-        year=old_year,
-        total_people=total_people,
-        gifts_given=gifts_given,
-        handwritten_cards=handwritten_cards,
-        ecards_sent=ecards_sent,
-        completed_date=date.today()
-    )
-    db.session.add(summary)
+        # Mark gift ideas as used if gift was given
+        with _timed_stage(timings, 'gift_ideas'):
+            _mark_given_gift_ideas(old_year)
 
-    # Mark gift ideas as used if gift was given
-    completed_gift_tasks = Task.query.filter_by(
-        year=old_year,
-        task_type='gift_given',
-        completed=True
-    ).all()
+        # Create new milestones for new year
+        with _timed_stage(timings, 'milestones'):
+            seed_milestones_for_year(new_year, commit=False)
 
-    for task in completed_gift_tasks:
-        if task.person_id:
-            # Find most recent unused gift idea for this person
-            gift_idea = GiftIdea.query.filter_by(
-                person_id=task.person_id,
-                used_year=None
-            ).order_by(GiftIdea.added_date.desc()).first()
+        # Freeze what the archive page shows for the old year
+        with _timed_stage(timings, 'snapshot'):
+            write_archive_snapshot(old_year)
 
-            if gift_idea:
-                gift_idea.used_year = old_year
+        with _timed_stage(timings, 'commit'):
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
 
-    # Create new milestones for new year
-    seed_milestones_for_year(new_year)
+    current_app.logger.info('Rolled over %s -> %s; stage timings (ms): %s', old_year, new_year, timings)
 
-    db.session.commit()
+    # The archived year is no longer the active one
+    invalidate_active_year_cache()
 
     # Return summary for display to user
     return {
@@ -281,6 +405,7 @@ def perform_rollover(old_year, new_year):
 def initialize_database():
     """Initialize database on first run."""
     db.create_all()
+    apply_schema_migrations()
 
     # Seed milestones for active year if none exist
     active_year = get_active_year()
@@ -288,3 +413,85 @@ def initialize_database():
 
     if existing_milestones == 0:
         seed_milestones_for_year(active_year)
+
+
+# Task types that can be checked off from the shopping list and writing queue
+TASK_TYPES = ('gift_purchased', 'gift_given', 'card_written')
+
+
+def _upsert_task(insert, completed):
+    """Add ON CONFLICT on the task key to ``insert``, setting completed.
+
+    ``completed`` is the new state as a SQL expression; in the SET clause
+    plain task columns still hold the existing row. Inserted rows must carry
+    today's completed_date whenever the new state can be completed; an
+    already completed task keeps its own.
+    """
+    return insert.on_conflict_do_update(
+        index_elements=[Task.person_id, Task.year, Task.task_type],
+        set_={
+            'completed': completed,
+            'completed_date': db.case(
+                (db.not_(completed), None),
+                (Task.completed == True, db.func.coalesce(Task.completed_date, insert.excluded.completed_date)),
+                else_=insert.excluded.completed_date
+            )
+        }
+    ).returning(Task.id, Task.person_id, Task.task_type, Task.completed)
+
+
+def set_task_state(person_id, task_type, year, completed=None):
+    """Create or update one task with a single INSERT ... ON CONFLICT DO UPDATE.
+
+    ``completed=None`` toggles the task; a task that doesn't exist yet is
+    created completed. Returns (task_id, completed), or None if the person
+    doesn't exist. Does not commit.
+    """
+    new_state = True if completed is None else completed
+    # INSERT ... SELECT so a missing person inserts nothing
+    insert = sqlite_insert(Task).from_select(
+        ['person_id', 'year', 'task_type', 'description', 'completed', 'completed_date'],
+        db.select(
+            Person.id, db.literal(year), db.literal(task_type), db.literal(f'{task_type} for {year}'),
+            db.literal(new_state), db.literal(date.today() if new_state else None, db.Date)
+        ).where(Person.id == person_id)
+    )
+    if completed is None:
+        state = db.case((Task.completed == True, False), else_=True)
+    else:
+        state = insert.excluded.completed
+    row = db.session.execute(_upsert_task(insert, state)).first()
+    return (row.id, bool(row.completed)) if row else None
+
+
+def apply_task_mutations(mutations, year):
+    """Set the completion state of many (person, task type) tasks at once.
+
+    ``mutations`` is a list of (person_id, task_type, completed); later
+    entries for the same task win. Every task is created or updated by one
+    bulk INSERT ... ON CONFLICT DO UPDATE. Callers check that the people
+    exist. Does not commit.
+
+    Returns {(person_id, task_type): (task_id, completed)} for every task.
+    """
+    wanted = {(person_id, task_type): completed for person_id, task_type, completed in mutations}
+    if not wanted:
+        return {}
+    today = date.today()
+
+    insert = sqlite_insert(Task)
+    rows = [{
+        'person_id': person_id,
+        'year': year,
+        'task_type': task_type,
+        'description': f'{task_type} for {year}',
+        'completed': completed,
+        'completed_date': today if completed else None
+    } for (person_id, task_type), completed in wanted.items()]
+
+    return {
+        (person_id, task_type): (task_id, bool(completed))
+        for task_id, person_id, task_type, completed in db.session.execute(
+            _upsert_task(insert, insert.excluded.completed), rows
+        )
+    }
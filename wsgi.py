@@ -0,0 +1,9 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app, init_database
+
+app = create_app()
+# With preload_app this runs once in the master process, before workers fork
+init_database(app)